@@ -5,5 +5,10 @@
 import controller
 
 if __name__ == '__main__':
-    controller.app.run_server()#debug=True)
+    # PAIRS_INSTRUMENT=1 times the pipeline stages; their JSON logs are printed and served at /metrics
+    import os
+    if os.environ.get("PAIRS_INSTRUMENT", "0") != "0":
+        import logging
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    controller.app.run()#debug=True)
 
@@ -4,22 +4,25 @@
 
 import pandas as pd
 import numpy as np
+import itertools
 import warnings
 
+import instrument
+
 
 def split_train_test(x: pd.core.series.Series, pct_insample: float = 0.7) -> pd.core.series.Series:
     """
     function to normalize the prices of stocks.
     
     parameters:
-        x: a pandas Series.
+        x: a pandas Series, or a numpy array with time on axis 0.
         pct: a float that specifies the size (percentage) of the in-sample. Default value is equal to 70%. 
     """
     
     try:
         n = round(len(x)*pct_insample)
-        train = x.iloc[:n]
-        test = x.iloc[n:]
+        train = getattr(x, "iloc", x)[:n]
+        test = getattr(x, "iloc", x)[n:]
     except (TypeError, AttributeError, ValueError):
         warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64.")
         return -1
@@ -28,6 +31,84 @@ def split_train_test(x: pd.core.series.Series, pct_insample: float = 0.7) -> pd.
 
 
 
+# A transition of the position state machine maps the previous state (0 short, 1 flat,
+# 2 long) to the next one; the 27 possible maps are coded as f(0)*9 + f(1)*3 + f(2).
+_TRANSITIONS = np.array(list(itertools.product(range(3), repeat=3)), dtype=np.uint8)
+_COMPOSE_TRANSITIONS = (_TRANSITIONS[np.arange(27)[:, np.newaxis, np.newaxis], _TRANSITIONS] @ np.array([9, 3, 1])).astype(np.uint8).ravel()
+
+
+
+def _signal_transitions(z: np.ndarray, open_position, close_position) -> np.ndarray:
+    """
+    function to code the transition of the position state machine at each bar.
+
+    parameters:
+        z: a numpy array of Z-scores, time on axis 0.
+        open_position: non-negative threshold(s) to open a position, broadcastable against z.
+        close_position: non-negative threshold(s) to close a position, broadcastable against z.
+    """
+
+    # from short: close when Z_score comes back to close_position
+    code = np.full(np.broadcast(z, open_position, close_position).shape, 0 * 9 + 1 * 3 + 2, dtype=np.uint8)
+    np.add(code, 9, out=code, where=z <= close_position)
+    # from flat: open long first, otherwise open short
+    np.subtract(code, 3, out=code, where=(z >= open_position) & ~(z <= -open_position))
+    np.add(code, 3, out=code, where=z <= -open_position)
+    # from long: close when Z_score comes back to -close_position
+    np.subtract(code, 1, out=code, where=z >= -close_position)
+
+    return code
+
+
+
+def _signal_states(z: np.ndarray, open_position, close_position, initial_state=0) -> np.ndarray:
+    """
+    function to run the position state machine over a whole array without a per-bar loop.
+
+    parameters:
+        z: a numpy array of Z-scores, time on axis 0.
+        open_position: non-negative threshold(s) to open a position, broadcastable against z.
+        close_position: non-negative threshold(s) to close a position, broadcastable against z.
+        initial_state: the position (-1, 0 or 1) before the first bar, flat by default.
+
+    The bar transitions are composed with a log-depth prefix scan, so the code at bar t
+    is the composition of every transition up to t; applying it to the initial state gives
+    the position as an int8 array with values -1, 0 and 1.
+    """
+
+    code = _signal_transitions(z, open_position, close_position)
+
+    step = 1
+    while step < len(code):
+        code[step:] = _COMPOSE_TRANSITIONS[code[step:].astype(np.uint16) * 27 + code[:-step]]
+        step *= 2
+
+    return _TRANSITIONS[code, np.add(initial_state, 1)].astype(np.int8) - 1
+
+
+
+def _signal_step(z: float, position: int, open_position: float, close_position: float) -> int:
+    """
+    function to apply the position state machine of _signal_transitions to a single bar.
+
+    parameters:
+        z: the Z-score of the bar.
+        position: the position (-1, 0 or 1) before the bar.
+        open_position: non-negative threshold to open a position.
+        close_position: non-negative threshold to close a position.
+    """
+
+    if position == -1:
+        return 0 if z <= close_position else -1
+    if position == 1:
+        return 0 if z >= -close_position else 1
+    if z <= -open_position:
+        return 1
+
+    return -1 if z >= open_position else 0
+
+
+
 def generate_signal(Z_score: pd.core.series.Series, open_position: float = 2, close_position: float = 0) -> pd.core.series.Series:
     """
     function to get the open and close signal of operations.
@@ -39,40 +120,16 @@ def generate_signal(Z_score: pd.core.series.Series, open_position: float = 2, cl
     """
 
     try:
-        signal = Z_score.copy()
-        signal[:] = np.nan
-
         # we are considering the same threshold for long and short position 
         open_position = np.abs(open_position)
         close_position = np.abs(close_position)
 
-        # initial position
-        if Z_score[0] <= -open_position:
-            signal[0] = 1
-        elif Z_score[0] >= open_position:
-            signal[0] = -1
-        else:
-            signal[0] = 0
-
-        # loop to verify if Z_score crosses threshold long or short
-        for t in range(1, len(Z_score)):
-            if signal[t-1] == 0:                   # when position is close 
-                if Z_score[t] <= -open_position:
-                    signal[t] = 1
-                elif Z_score[t] >= open_position:
-                    signal[t] = -1
-                else:
-                    signal[t] = 0
-            elif signal[t-1] == -1:                # when position is open at threshold long
-                if Z_score[t] <= close_position:
-                    signal[t] = 0
-                else:
-                    signal[t] = signal[t-1]
-            elif signal[t-1] == 1:                 # when position is open at threshold short
-                if Z_score[t] >= -close_position:
-                    signal[t] = 0
-                else:
-                    signal[t] = signal[t-1]
+        # long when Z_score crosses -open_position until it comes back to -close_position,
+        # short when it crosses open_position until it comes back to close_position
+        z = np.asarray(Z_score, dtype=np.float64)
+        signal = _signal_states(z, open_position, close_position).astype(np.float64)
+        if isinstance(Z_score, pd.Series):
+            signal = pd.Series(signal, index=Z_score.index, name=Z_score.name)
     except (TypeError, AttributeError, ValueError):
         warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64.")
         return -1
@@ -81,16 +138,63 @@ def generate_signal(Z_score: pd.core.series.Series, open_position: float = 2, cl
 
 
 
+def threshold_grid(open_positions, close_positions) -> np.ndarray:
+    """
+    function to build every (open_position, close_position) combination of two threshold lists.
+
+    parameters:
+        open_positions: an array-like with the thresholds to open a position.
+        close_positions: an array-like with the thresholds to close a position.
+    """
+
+    open_grid, close_grid = np.meshgrid(np.asarray(open_positions, dtype=np.float64),
+                                        np.asarray(close_positions, dtype=np.float64), indexing="ij")
+
+    return np.column_stack([open_grid.ravel(), close_grid.ravel()])
+
+
+
+def generate_signal_batch(Z_scores, thresholds) -> np.ndarray:
+    """
+    function to get the signal of many pairs and many threshold sets in a single pass.
+
+    parameters:
+        Z_scores: a 2-D numpy array or pandas DataFrame of Z-scores (time x pairs).
+        thresholds: an array-like of (open_position, close_position) rows, see threshold_grid.
+
+    Returns an int8 array of shape (time, pairs, thresholds) where [:, p, k] is equal
+    to generate_signal(Z_scores[:, p], *thresholds[k]).
+    """
+
+    try:
+        z = np.asarray(Z_scores, dtype=np.float64)
+        if z.ndim == 1:
+            z = z[:, np.newaxis]
+        thresholds = np.abs(np.asarray(thresholds, dtype=np.float64)).reshape(-1, 2)
+
+        signals = _signal_states(z[:, :, np.newaxis], thresholds[:, 0], thresholds[:, 1])
+    except (TypeError, AttributeError, ValueError):
+        warnings.warn("Input must be a 2-D array of Z-scores and an array of (open, close) thresholds.")
+        return -1
+
+    return signals
+
+
+
 def calculate_stock_return(price_series: pd.core.series.Series) -> pd.core.series.Series:
     """
     This function calculate the return (percentage variation) of stock's price series.
     
     parameters:
-        price_series: a pandas Series dtype float64.
+        price_series: a pandas Series dtype float64, or a numpy array with time on axis 0.
     """
     
     try:
-        stock_return = np.log(price_series).diff().fillna(0)
+        if isinstance(price_series, np.ndarray):
+            stock_return = np.diff(np.log(price_series), axis=0, prepend=np.nan)
+            stock_return = np.where(np.isnan(stock_return), 0, stock_return)
+        else:
+            stock_return = np.log(price_series).diff().fillna(0)
     except (TypeError, AttributeError, ValueError):
         warnings.warn("Input must be a pandas.core.series.Series dtype float64.")
         return -1
@@ -99,7 +203,104 @@ def calculate_stock_return(price_series: pd.core.series.Series) -> pd.core.serie
 
 
 
-def calculate_trade_return(signal: pd.core.series.Series, x: pd.core.series.Series, y: pd.core.series.Series) -> pd.core.series.Series:
+def _trade_returns(signal: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    function to calculate trade's return from the lagged signal on numpy arrays, time on axis 0.
+
+    parameters:
+        signal: a numpy array of signals, with x and y broadcastable against it.
+        x: a numpy array with the independent variable returns.
+        y: a numpy array with the dependent variable returns.
+    """
+
+    # use t-1 to avoid look-ahead bias
+    position = signal[:-1]
+    spread_return = np.subtract(y[1:], x[1:])
+
+    trade_return = np.full(np.broadcast(signal, x, y).shape, np.nan)
+    trade_return[:1] = 0
+    np.copyto(trade_return[1:], spread_return, where=position == 1)
+    np.copyto(trade_return[1:], -spread_return, where=position == -1)
+    np.copyto(trade_return[1:], 0, where=position == 0)
+
+    return trade_return
+
+
+
+class CostModel:
+    """
+    costs of trading a pair, as fractions of the capital of each leg, charged where the position changes.
+
+    parameters:
+        commission_bps: the brokerage commission on the value traded, in basis points.
+        slippage_bps: the distance between the close and the fill price, in basis points of the value traded.
+        fee_per_order: a fixed fee per order, in currency; divided by capital.
+        capital: the capital of each leg, in currency, used with fee_per_order.
+        borrow_bps_per_day: the rent of the shorted stock, in basis points per day the short is held.
+        bars_per_day: the number of bars in a day, to charge the borrow per bar on intraday prices.
+        fee_schedule: an optional dict of per-ticker fees in basis points of the value traded, such as the
+            exchange and settlement fees of B3, which depend on the kind of asset.
+        default_fee_bps: the fee of the tickers not in fee_schedule.
+
+    Opening or closing a position trades one unit of capital on each leg, and a flip from short to
+    long trades two units in two orders.
+    """
+
+    def __init__(self, commission_bps: float = 0, slippage_bps: float = 0, fee_per_order: float = 0,
+                 capital: float = 1, borrow_bps_per_day: float = 0, bars_per_day: float = 1,
+                 fee_schedule: dict = None, default_fee_bps: float = 0):
+        self.commission_bps = commission_bps
+        self.slippage_bps = slippage_bps
+        self.fee_per_order = fee_per_order
+        self.capital = capital
+        self.borrow_bps_per_day = borrow_bps_per_day
+        self.bars_per_day = bars_per_day
+        self.fee_schedule = fee_schedule if fee_schedule is not None else {}
+        self.default_fee_bps = default_fee_bps
+
+    def fee_bps(self, tickers) -> np.ndarray:
+        """
+        the fee of each ticker in fee_schedule, in basis points.
+        """
+
+        return np.array([self.fee_schedule.get(ticker, self.default_fee_bps) for ticker in tickers], dtype=np.float64)
+
+
+
+def _trade_costs(signal: np.ndarray, costs: CostModel, fee_x=0, fee_y=0) -> np.ndarray:
+    """
+    function to calculate the cost of trading a pair at each bar from the changes of its signal, time on axis 0.
+
+    parameters:
+        signal: a numpy array of signals, flat before the first bar.
+        costs: the CostModel.
+        fee_x: the fee of the independent stock in basis points, broadcastable against signal.
+        fee_y: the fee of the dependent stock in basis points, broadcastable against signal.
+
+    The borrow is charged on the bars that earn the return of a position held from the bar before,
+    as _trade_returns; the other costs on the bar where the position changes.
+    """
+
+    signal = np.nan_to_num(signal)
+    previous = np.concatenate([np.zeros_like(signal[:1]), signal[:-1]])
+    changed = signal != previous
+
+    # value traded on each leg, and the number of orders (a close and an open for a flip)
+    traded = np.abs(signal - previous)
+    orders = (changed & (previous != 0)).astype(np.int8) + (changed & (signal != 0))
+
+    proportional_bps = 2 * (costs.commission_bps + costs.slippage_bps) + np.add(fee_x, fee_y)
+    cost = traded * proportional_bps / 10000 + orders * (2 * costs.fee_per_order / costs.capital)
+    if costs.borrow_bps_per_day:
+        # one leg is short whenever a position is held
+        cost = cost + (previous != 0) * (costs.borrow_bps_per_day / 10000 / costs.bars_per_day)
+
+    return cost
+
+
+
+def calculate_trade_return(signal: pd.core.series.Series, x: pd.core.series.Series, y: pd.core.series.Series,
+                           costs: CostModel = None, tickers: tuple = None) -> pd.core.series.Series:
     """
     This function calculate trade's return of the pair.
     
@@ -107,28 +308,73 @@ def calculate_trade_return(signal: pd.core.series.Series, x: pd.core.series.Seri
         signal: a pandas Series dtype float64.
         x: a pandas Series dtype float64 and x is the independent variable returns.
         y: a pandas Series dtype float64 and y is the dependent variable returns.
+        costs: an optional CostModel; its costs are subtracted from the returns.
+        tickers: the (ticker1, ticker2) of the pair, to look up the fee_schedule of costs.
     """
     
     try:
-        trade_return = signal.copy()
-        trade_return[:] = np.nan
-        trade_return[0] = 0                       
-
-        for t in range(1, len(signal)):
-            # use t-1 to avoid look-ahead bias
-            if signal[t-1] == -1:
-                trade_return[t] = np.add(-y[t], x[t])
-            if signal[t-1] == 1:
-                trade_return[t] = np.add(y[t], -x[t])
-            if signal[t-1] == 0:
-                trade_return[t] = 0
-    except (TypeError, AttributeError, ValueError):
+        signal_values = np.asarray(signal, dtype=np.float64)
+        trade_return = _trade_returns(signal_values,
+                                      np.asarray(x, dtype=np.float64),
+                                      np.asarray(y, dtype=np.float64))
+        if costs is not None:
+            fee_x, fee_y = costs.fee_bps(tickers) if tickers is not None else (costs.default_fee_bps,) * 2
+            trade_return -= _trade_costs(signal_values, costs, fee_x, fee_y)
+        if isinstance(signal, pd.Series):
+            trade_return = pd.Series(trade_return, index=signal.index, name=signal.name)
+    except (TypeError, AttributeError, ValueError, IndexError):
         warnings.warn("Input must be a pandas.core.series.Series dtype float64.")
         return -1
     
     return trade_return
 
 
+
+def calculate_trade_return_batch(signals, x, y, costs: CostModel = None, pairs=None) -> np.ndarray:
+    """
+    This function calculate trade's return of many pairs at once.
+
+    parameters:
+        signals: a numpy array of signals (time x pairs), or (time x pairs x thresholds) from generate_signal_batch.
+        x: a 2-D numpy array or pandas DataFrame (time x pairs) with the independent variable returns.
+        y: a 2-D numpy array or pandas DataFrame (time x pairs) with the dependent variable returns.
+        costs: an optional CostModel; its costs are subtracted from the returns.
+        pairs: the (ticker1, ticker2) of each pair, to look up the fee_schedule of costs.
+    """
+
+    try:
+        signals = np.asarray(signals)
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        y = np.ascontiguousarray(y, dtype=np.float64)
+
+        # line up the returns with extra signal axes, such as threshold sets
+        extra_axes = (1,) * (signals.ndim - x.ndim)
+        trade_return = _trade_returns(signals, x.reshape(x.shape + extra_axes), y.reshape(y.shape + extra_axes))
+        if costs is not None:
+            trade_return -= _pair_costs(signals, costs, pairs, extra_axes)
+    except (TypeError, AttributeError, ValueError, IndexError):
+        warnings.warn("Input x and y must be (time x pairs) returns aligned with signals.")
+        return -1
+
+    return trade_return
+
+
+
+def _pair_costs(signals: np.ndarray, costs: CostModel, pairs, extra_axes: tuple = ()) -> np.ndarray:
+    """
+    function to calculate the costs of many pairs (time x pairs x ...), with the fees of their tickers.
+    """
+
+    if pairs is None:
+        return _trade_costs(signals, costs, costs.default_fee_bps, costs.default_fee_bps)
+
+    fee_x = costs.fee_bps([ticker1 for ticker1, _ in pairs]).reshape((-1,) + extra_axes)
+    fee_y = costs.fee_bps([ticker2 for _, ticker2 in pairs]).reshape((-1,) + extra_axes)
+
+    return _trade_costs(signals, costs, fee_x, fee_y)
+
+
+
 def calculate_compound_return(x: pd.core.series.Series) -> pd.core.series.Series:
     """
     This function calculate the compound return of a trade strategy.
@@ -146,45 +392,261 @@ def calculate_compound_return(x: pd.core.series.Series) -> pd.core.series.Series
     return compound_return
 
 
-def calculate_drawdown(R, geometric=True, na_rm=True):
+def _drawdowns(returns: np.ndarray, geometric: bool = True) -> np.ndarray:
+    """
+    function to calculate the drawdown of return series, time on axis 0, NaN returns skipped.
+
+    parameters:
+        returns: a numpy array of returns, one column per series.
+        geometric: True compounds the returns, False adds them.
+
+    The wealth starts at 1 and the peak at each bar includes that bar, so the drawdown is never positive.
+    """
+
+    filled = np.where(np.isnan(returns), 0, returns)
+    wealth = np.cumprod(1 + filled, axis=0) if geometric else 1 + np.cumsum(filled, axis=0)
+    peak = np.maximum(np.maximum.accumulate(wealth, axis=0), 1)
+
+    return wealth / peak - 1
+
+
+
+def _drawdown_summary(drawdown: np.ndarray, valid: np.ndarray) -> dict:
+    """
+    function to find the maximum drawdown of each column of a 2-D drawdown array and how long it lasted.
+
+    parameters:
+        drawdown: a 2-D numpy array from _drawdowns (time x series), without NaN.
+        valid: a 2-D boolean numpy array, False where the return was missing.
+
+    Durations are counted in bars with a return, so missing bars do not lengthen a drawdown.
+    Positions are -1 for the start (peak at the initial wealth) and len(drawdown) for a drawdown
+    not recovered yet.
+    """
+
+    n, columns = drawdown.shape
+    bars = np.arange(n)[:, np.newaxis]
+    column = np.arange(columns)
+    # clock[t] is the number of bars with a return up to t; clock[-1] (the start) is 0
+    clock = np.concatenate([np.cumsum(valid, axis=0), np.zeros((1, columns), dtype=np.int64)])
+    at_peak = (drawdown >= 0) & valid
+
+    trough = np.argmin(drawdown, axis=0)
+    max_drawdown = drawdown[trough, column]
+    peak = np.maximum.accumulate(np.where(at_peak, bars, -1), axis=0)[trough, column]
+    next_peak = np.minimum.accumulate(np.where(at_peak, bars, n)[::-1], axis=0)[::-1][trough, column]
+    recovered = next_peak < n
+    recovery = np.where(recovered, next_peak, n)
+
+    # the longest run of bars below the peak, of any drawdown
+    run = clock[:-1] - clock[np.maximum.accumulate(np.where(at_peak, bars, -1), axis=0), column]
+    longest = np.max(np.where(at_peak, 0, run), axis=0, initial=0)
+
+    end = np.where(recovered, recovery, n - 1)
+    duration = np.where(max_drawdown < 0, clock[end, column] - clock[peak, column], 0)
+    recovery_time = np.where(recovered, clock[np.minimum(recovery, n - 1), column] - clock[trough, column], np.nan)
+
+    # a column without returns has no drawdown
+    empty = ~valid.any(axis=0)
+
+    return {"max_drawdown": np.where(empty, np.nan, max_drawdown),
+            "peak": np.where(max_drawdown < 0, peak, trough),
+            "trough": trough,
+            "recovery": np.where(max_drawdown < 0, recovery, trough),
+            "duration": np.where(empty, np.nan, duration),
+            "recovery_time": np.where(empty | (max_drawdown < 0), recovery_time, 0),
+            "longest_drawdown": np.where(empty, np.nan, longest)}
+
+
+
+def calculate_drawdown(R, geometric=True, na_rm=True, summary=False):
     """
     Calculates drawdown of input series based on the geometric or arithmetic method specified by the geometric flag.
     
     Parameters:
-    R (pandas DataFrame or array-like object): Input series.
+    R (pandas DataFrame or array-like object): Input series, one column per return series.
     geometric (bool): Flag to specify if geometric drawdown should be used. Default is True.
     na_rm (bool): Flag to specify if missing values should be removed from the output. Default is True.
+    summary (bool): Flag to also return the maximum drawdown of each column and how long it lasted. Default is False.
     
     Returns:
-    pandas DataFrame: The drawdowns of the input series.
+    pandas DataFrame: The drawdowns of the input series, NaN where a return is missing.
+    With summary, (drawdown, summary) where summary has one row per column with max_drawdown, the dates
+    of its peak, trough and recovery (NaT before the first date or when not recovered), its duration
+    from peak to recovery and its recovery_time from trough to recovery, in bars, and the longest_drawdown
+    in bars of any drawdown.
+
+    Every column is computed at once: the wealth is 1 plus the cumulative product (or sum) of the
+    returns, missing returns skipped, and the peak is its running maximum, starting at 1.
     """
+
     if isinstance(R, pd.DataFrame):
         x = R
     else:
         x = pd.DataFrame(R)
-        
-    columns = x.shape[1]
-    columnnames = x.columns
-    
-    def colDrawdown(x, geometric):
-        if geometric:
-            Return_cumulative = np.cumprod(1 + x)
-        else:
-            Return_cumulative = 1 + np.cumsum(x)
-        maxCumulativeReturn = np.maximum.accumulate(np.concatenate(([1], Return_cumulative)))[:-1]
-        column_drawdown = Return_cumulative/maxCumulativeReturn - 1
-        return column_drawdown
-    
-    for column in range(columns):
-        column_drawdown = x.iloc[:, column].dropna().apply(colDrawdown, geometric=geometric)
-        if column == 0:
-            drawdown = column_drawdown
-        else:
-            drawdown = pd.merge(drawdown, column_drawdown, left_index=True, right_index=True, how='outer')
-    
-    drawdown.columns = columnnames
-    
+
+    returns = x.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(returns)
+    drawdown = _drawdowns(returns, geometric)
+
+    if summary and len(returns):
+        statistics = _drawdown_summary(drawdown, valid)
+
+    drawdown = pd.DataFrame(np.where(valid, drawdown, np.nan), index=x.index, columns=x.columns)
     if na_rm:
         drawdown = drawdown.dropna(how='all')
-        
-    return drawdown
+
+    if not summary:
+        return drawdown
+
+    # without rows there is no drawdown to summarize
+    if len(returns) == 0:
+        table = pd.DataFrame(np.nan, index=x.columns, columns=["max_drawdown", "peak", "trough", "recovery", "duration",
+                                                                "recovery_time", "longest_drawdown"])
+        return drawdown, table.astype({"peak": "datetime64[ns]", "trough": "datetime64[ns]", "recovery": "datetime64[ns]"})
+
+    # positions outside the index (the start, or not recovered) and columns without returns become NaT
+    dates = x.index
+    def date_at(positions):
+        inside = (positions >= 0) & (positions < len(dates)) & valid.any(axis=0)
+        return pd.Series(dates[np.clip(positions, 0, max(len(dates) - 1, 0))], index=x.columns).where(inside)
+
+    table = pd.DataFrame({"max_drawdown": statistics["max_drawdown"],
+                          "peak": date_at(statistics["peak"]),
+                          "trough": date_at(statistics["trough"]),
+                          "recovery": date_at(statistics["recovery"]),
+                          "duration": statistics["duration"],
+                          "recovery_time": statistics["recovery_time"],
+                          "longest_drawdown": statistics["longest_drawdown"]}, index=x.columns)
+
+    return drawdown, table
+
+
+
+def calculate_performance(trade_return, signal, periods_per_year: int = 252) -> dict:
+    """
+    This function calculate the summary statistics of trade returns, time on axis 0.
+
+    parameters:
+        trade_return: a numpy array or pandas object with trade returns, one column per strategy.
+        signal: a numpy array or pandas object with the signals that generated the returns.
+        periods_per_year: the number of bars in a year, used to annualize the Sharpe ratio.
+
+    Returns a dict of arrays with total_return, sharpe, max_drawdown and n_trades.
+    """
+
+    trade_return = np.nan_to_num(np.asarray(trade_return, dtype=np.float64))
+    signal = np.asarray(signal)
+
+    volatility = np.std(trade_return, axis=0, ddof=1) if len(trade_return) > 1 else np.full(trade_return.shape[1:], np.nan)
+
+    # a trade starts at every bar where the signal leaves zero
+    previous = np.concatenate([np.zeros_like(signal[:1]), signal[:-1]])
+    entries = (signal != 0) & (signal != previous)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {"total_return": np.sum(trade_return, axis=0),
+                "sharpe": np.mean(trade_return, axis=0) / volatility * np.sqrt(periods_per_year),
+                # compound return is the cumulative sum of the log returns, see calculate_compound_return
+                "max_drawdown": np.min(_drawdowns(trade_return, geometric=False), axis=0, initial=0),
+                "n_trades": np.sum(entries, axis=0)}
+
+
+
+def _pair_columns(prices, pairs) -> tuple:
+    """
+    function to find the columns of many pairs in a price panel.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks, or a dal.IntradayPanel.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns, or a list of (ticker1, ticker2) tuples.
+
+    Returns (pairs, values, dates, columns, first, second): the pairs as a list of tuples, the prices as
+    a numpy array (dates x tickers) and their dates, the columns of values with the tickers of the pairs,
+    each once, and the positions in columns of the independent and dependent ticker of each pair.
+    """
+
+    if isinstance(pairs, pd.DataFrame):
+        pairs = list(zip(pairs["ticker1"], pairs["ticker2"]))
+    pairs = [tuple(pair) for pair in pairs]
+    if isinstance(prices, pd.DataFrame):
+        values, tickers, dates = prices.to_numpy(), list(prices.columns), prices.index
+    else:
+        values, tickers, dates = prices.values, list(prices.tickers), prices.index
+
+    position = {ticker: i for i, ticker in enumerate(tickers)}
+    used = list(dict.fromkeys(ticker for pair in pairs for ticker in pair))
+    used_position = {ticker: i for i, ticker in enumerate(used)}
+    columns = np.array([position[ticker] for ticker in used], dtype=np.intp)
+    first = np.array([used_position[ticker1] for ticker1, _ in pairs], dtype=np.intp)
+    second = np.array([used_position[ticker2] for _, ticker2 in pairs], dtype=np.intp)
+
+    return pairs, values, dates, columns, first, second
+
+
+
+def _distance_z_score(values: np.ndarray, first: np.ndarray, second: np.ndarray, n: int, start: int = 0) -> np.ndarray:
+    """
+    function to run the steps of distance_approach on many pairs at once: normalize, spread and Z-score.
+
+    parameters:
+        values: a 2-D numpy array (dates x tickers) of float64 prices.
+        first: the column of the independent ticker of each pair.
+        second: the column of the dependent ticker of each pair.
+        n: the number of in-sample bars, see split_train_test.
+        start: the first in-sample bar of the min, max and mean; the in-sample bars before it are not used.
+
+    As main_pipe, prices are normalized with the in-sample min and max, and the spread is centered on
+    its in-sample mean and divided by its out-of-sample standard deviation. Returns the Z-score (dates x pairs).
+    """
+
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        minimum, maximum = np.nanmin(values[start:n], axis=0), np.nanmax(values[start:n], axis=0)
+        normalized = (values - minimum) / (maximum - minimum)
+        spread = normalized[:, second] - normalized[:, first]
+
+        return (spread - np.nanmean(spread[start:n], axis=0)) / np.nanstd(spread[n:], axis=0)
+
+
+
+@instrument.timed("backtest_pairs")
+def backtest_pairs(prices: pd.DataFrame, pairs, open_position: float = 1, close_position: float = 0,
+                   pct_insample: float = 0.7, periods_per_year: int = 252, costs: CostModel = None) -> pd.DataFrame:
+    """
+    This function run the distance approach backtest of controller.main_pipe for many pairs at once.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks, or a dal.IntradayPanel.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns, or a list of (ticker1, ticker2) tuples.
+        open_position: the Z-score where a position is opened.
+        close_position: the Z-score where a position is closed.
+        pct_insample: the size (percentage) of the in-sample, see split_train_test.
+        periods_per_year: the number of bars in a year, used to annualize the Sharpe ratio.
+        costs: an optional CostModel; its costs are subtracted from the returns.
+
+    Returns a pandas DataFrame with one row per pair and the columns of calculate_performance.
+    """
+
+    try:
+        pairs, values, _, columns, first, second = _pair_columns(prices, pairs)
+        # only the columns of the pairs are converted, so a float32 panel is never copied whole
+        values = values[:, columns].astype(np.float64)
+
+        n = round(len(values)*pct_insample)
+        z_score = _distance_z_score(values, first, second, n)
+
+        signal = _signal_states(z_score, np.abs(open_position), np.abs(close_position))
+        returns = np.nan_to_num(np.diff(np.log(values), axis=0, prepend=np.nan))
+        trade_return = _trade_returns(signal, returns[:, first], returns[:, second])
+        if costs is not None:
+            trade_return -= _pair_costs(signal, costs, pairs)
+
+        performance = pd.DataFrame(calculate_performance(trade_return, signal, periods_per_year))
+        performance.insert(0, "ticker1", [ticker1 for ticker1, _ in pairs])
+        performance.insert(1, "ticker2", [ticker2 for _, ticker2 in pairs])
+    except (TypeError, AttributeError, ValueError, KeyError):
+        warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64 and pairs of its columns.")
+        return -1
+
+    return performance
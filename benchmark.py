@@ -0,0 +1,383 @@
+### Benchmark module
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from pairs_methods import cointegration_approach as coint
+from pairs_methods import distance_approach as dist
+import backtest
+import viewer
+
+
+def synthetic_prices(n_bars: int, n_tickers: int, seed: int = 0, freq: str = "B") -> pd.DataFrame:
+    """
+    function to create a random price panel, with common factors so some pairs are cointegrated.
+
+    parameters:
+        n_bars: the number of dates.
+        n_tickers: the number of tickers.
+        seed: the seed of the random generator.
+        freq: the pandas frequency of the dates, such as "B" for business days or "min" for long intraday panels.
+    """
+
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(size=(n_bars, 5)).cumsum(axis=0) / 100
+    loadings = rng.uniform(0, 1, size=(5, n_tickers))
+    log_prices = factors @ loadings + rng.normal(size=(n_bars, n_tickers)) / 100 + np.log(rng.uniform(5, 50, n_tickers))
+
+    return pd.DataFrame(np.exp(log_prices),
+                        index=pd.date_range("2000-01-03", periods=n_bars, freq=freq, name="Date"),
+                        columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+
+
+def benchmark_cointegration(n_bars: int = 750, n_tickers: int = 60, lags: int = 1) -> dict:
+    """
+    function to time the batched Engle-Granger screening against a loop of cointegration calls.
+
+    parameters:
+        n_bars: the number of dates of the synthetic panel.
+        n_tickers: the number of tickers; every combination of them is tested.
+        lags: the number of lagged differences in the ADF regressions.
+    """
+
+    prices = synthetic_prices(n_bars, n_tickers)
+    pairs = list(itertools.combinations(prices.columns, 2))
+
+    start = time.perf_counter()
+    loop = pd.DataFrame([coint.cointegration(prices[ticker1], prices[ticker2], lags) for ticker1, ticker2 in pairs])
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = coint.screen_cointegration(prices, pairs, lags)
+    batch_seconds = time.perf_counter() - start
+
+    loop.index = pd.MultiIndex.from_tuples(pairs)
+    batch = batch.set_index(["ticker1", "ticker2"]).loc[loop.index]
+
+    return {"pairs": len(pairs),
+            "loop_seconds": loop_seconds,
+            "batch_seconds": batch_seconds,
+            "speedup": loop_seconds / batch_seconds,
+            "max_abs_diff_adf_stat": float(np.max(np.abs(loop["adf_stat"] - batch["adf_stat"])))}
+
+
+
+_COLD_START = """
+import time
+start = time.perf_counter()
+import controller
+imported = time.perf_counter()
+controller.create_app()
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+
+def benchmark_cold_start(repeat: int = 5) -> dict:
+    """
+    function to time, in fresh interpreters, importing controller and creating the Dash app.
+
+    parameters:
+        repeat: the number of interpreters started; the median is reported.
+    """
+
+    folder = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _COLD_START], cwd=folder, capture_output=True, text=True, check=True)
+        timings.append([float(value) for value in output.stdout.split()])
+    timings = np.array(timings)
+
+    return {"import_seconds": float(np.median(timings[:, 0])),
+            "create_app_seconds": float(np.median(timings[:, 1])),
+            "total_seconds": float(np.median(timings.sum(axis=1)))}
+
+
+
+def _measure(function, repeat: int) -> dict:
+    """
+    function to get the median time of repeat calls of function and the peak memory allocated by one call.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": float(np.median(timings)), "peak_bytes": peak}
+
+
+
+def benchmark_viewer(n_bars: int = 100_000, repeat: int = 5) -> dict:
+    """
+    function to time the figures of the dashboard and the memory allocated to build each of them.
+
+    parameters:
+        n_bars: the number of dates of the synthetic series.
+        repeat: the number of builds timed; the median is reported.
+    """
+
+    prices = synthetic_prices(n_bars, 2, freq="min")
+    stock1_norm, stock2_norm = prices.iloc[:, 0] / prices.iloc[0, 0], prices.iloc[:, 1] / prices.iloc[0, 1]
+    z_score = (stock1_norm - stock2_norm - (stock1_norm - stock2_norm).mean()) / (stock1_norm - stock2_norm).std()
+    signal = pd.Series(np.sign(z_score.round()), index=prices.index)
+    cum_trade_return = stock1_norm.pct_change().fillna(0).add(1).cumprod()
+
+    figures = {"zscore_fig": lambda: viewer.generate_zscore_fig(z_score, signal, "T0000", "T0001"),
+               "normalized_fig": lambda: viewer.generate_normalized_fig(stock1_norm, stock2_norm, "T0000", "T0001"),
+               "trade_returns_fig": lambda: viewer.generate_trade_returns_fig(cum_trade_return),
+               "all_figures": lambda: viewer.generate_figures(prices.index, z_score.to_numpy(), signal.to_numpy(),
+                                                              stock1_norm.to_numpy(), stock2_norm.to_numpy(),
+                                                              cum_trade_return.to_numpy(), "T0000", "T0001")}
+
+    results = {}
+    for name, function in figures.items():
+        measure = _measure(function, repeat)
+        results[f"{name}_seconds"] = measure["seconds"]
+        results[f"{name}_peak_bytes"] = measure["peak_bytes"]
+
+    return results
+
+
+
+class _PanelProvider:
+    """
+    provider of the adjusted close prices of a synthetic panel, so main_pipe runs without a download.
+    """
+
+    def __init__(self, prices: pd.DataFrame):
+        self.prices = prices
+
+    def fetch(self, ticker: str, start_date: str, end_date: str) -> pd.core.series.Series:
+        x = self.prices[ticker]
+        x = x.loc[(x.index >= start_date) & (x.index < end_date)]
+
+        return x.rename("Adj Close")
+
+
+
+def benchmark_main_pipe(prices: pd.DataFrame, repeat: int = 5) -> dict:
+    """
+    function to time main_pipe end-to-end on the first two tickers of a panel, served from a price cache on disk.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers), from synthetic_prices.
+        repeat: the number of runs timed; the median is reported.
+
+    The pipe cache is cleared before each cold run, so it times loading the prices, the backtest and
+    the figures; the warm run is a pipe cache hit on the same pair.
+    """
+
+    import controller
+    import get_fin_data as gfd
+
+    ticker1, ticker2 = prices.columns[:2]
+    start_date = str(prices.index[0].date())
+    directory = tempfile.mkdtemp(prefix="benchmark_cache_")
+    default_cache = gfd._default_cache
+    gfd._default_cache = gfd.PriceCache(_PanelProvider(prices), directory)
+
+    def cold():
+        controller.get_pipe_cache().clear()
+        controller.main_pipe(ticker1, ticker2, start_date)
+
+    try:
+        results = {"main_pipe_cold": _measure(cold, repeat),
+                   "main_pipe_warm": _measure(lambda: controller.main_pipe(ticker1, ticker2, start_date), repeat)}
+    finally:
+        gfd._default_cache = default_cache
+        controller.get_pipe_cache().clear()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return results
+
+
+
+def benchmark_pipeline(n_bars: int = 750, n_tickers: int = 60, repeat: int = 5, pct_insample: float = 0.7) -> dict:
+    """
+    function to time each step of the distance approach on a synthetic panel, and main_pipe end-to-end.
+
+    parameters:
+        n_bars: the number of dates of the synthetic panel.
+        n_tickers: the number of tickers; the steps run on the n_tickers / 2 pairs of consecutive tickers.
+        repeat: the number of runs timed; the median is reported.
+        pct_insample: the size (percentage) of the in-sample.
+
+    Each step takes the output of the step before it, computed once, so only the step itself is timed.
+    The figures are timed on the first pair, since the dashboard shows one pair. Returns a dict with
+    the seconds and peak_bytes of each step.
+    """
+
+    prices = synthetic_prices(n_bars, max(n_tickers, 2))
+    values = prices.to_numpy()
+    first, second = np.arange(0, values.shape[1] - 1, 2), np.arange(1, values.shape[1], 2)
+    train, test = backtest.split_train_test(values, pct_insample)
+
+    norm_train, norm_test = dist.normalize_series(train, test)
+    spread_train = dist.spread_distance(norm_train[:, first], norm_train[:, second])
+    spread_test = dist.spread_distance(norm_test[:, first], norm_test[:, second])
+    z_score = np.concatenate(dist.Z_score(spread_train, spread_test))
+    signal = backtest.generate_signal(z_score)
+    stock_return = backtest.calculate_stock_return(values)
+    trade_return = backtest.calculate_trade_return(signal, stock_return[:, first], stock_return[:, second])
+    cum_trade_return = np.cumsum(trade_return, axis=0)
+    norm = np.concatenate([norm_train, norm_test])
+
+    steps = {"normalize_series": lambda: dist.normalize_series(train, test),
+             "spread_distance": lambda: dist.spread_distance(norm_train[:, first], norm_train[:, second]),
+             "Z_score": lambda: dist.Z_score(spread_train, spread_test),
+             "generate_signal": lambda: backtest.generate_signal(z_score),
+             "calculate_trade_return": lambda: backtest.calculate_trade_return(signal, stock_return[:, first],
+                                                                               stock_return[:, second]),
+             "calculate_drawdown": lambda: backtest.calculate_drawdown(pd.DataFrame(trade_return, index=prices.index),
+                                                                       geometric=False),
+             "backtest_pairs": lambda: backtest.backtest_pairs(prices, list(zip(prices.columns[first], prices.columns[second])),
+                                                               pct_insample=pct_insample),
+             "generate_zscore_fig": lambda: viewer.generate_zscore_fig(pd.Series(z_score[:, 0], index=prices.index),
+                                                                       pd.Series(signal[:, 0], index=prices.index),
+                                                                       "T0000", "T0001"),
+             "generate_normalized_fig": lambda: viewer.generate_normalized_fig(pd.Series(norm[:, 0], index=prices.index),
+                                                                               pd.Series(norm[:, 1], index=prices.index),
+                                                                               "T0000", "T0001"),
+             "generate_trade_returns_fig": lambda: viewer.generate_trade_returns_fig(
+                 pd.Series(cum_trade_return[:, 0], index=prices.index)),
+             "generate_figures": lambda: viewer.generate_figures(prices.index, z_score[:, 0], signal[:, 0], norm[:, 0],
+                                                                 norm[:, 1], cum_trade_return[:, 0], "T0000", "T0001")}
+
+    results = {name: _measure(function, repeat) for name, function in steps.items()}
+    results.update(benchmark_main_pipe(prices, repeat))
+
+    return results
+
+
+
+def save_results(benchmark: str, parameters: dict, results: dict, path: str) -> str:
+    """
+    function to write the results of a benchmark to a JSON file, with the commit and the environment they come from.
+
+    parameters:
+        benchmark: the name of the benchmark.
+        parameters: the parameters of the run, such as the number of bars and tickers.
+        results: the results of the benchmark.
+        path: the path of the JSON file, or of a folder where it is named after the benchmark and the commit.
+
+    Returns the path of the file written.
+    """
+
+    folder = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=folder, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    record = {"benchmark": benchmark,
+              "commit": commit,
+              "date": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(),
+              "numpy": np.__version__,
+              "pandas": pd.__version__,
+              "machine": platform.machine(),
+              "parameters": parameters,
+              "results": results}
+
+    if os.path.isdir(path):
+        path = os.path.join(path, f"{benchmark}_{commit or 'unknown'}.json")
+    with open(path, "w") as file:
+        json.dump(record, file, indent=2)
+
+    return path
+
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    # nested results become flat names, as {"Z_score": {"seconds": 1}} -> {"Z_score.seconds": 1}
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{name}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{name}"] = value
+
+    return flat
+
+
+
+def compare_results(baseline: str, current: str, tolerance: float = 0.1) -> pd.DataFrame:
+    """
+    function to compare two JSON files of save_results, to find regressions between commits.
+
+    parameters:
+        baseline: the path of the JSON file of the reference run.
+        current: the path of the JSON file of the new run.
+        tolerance: the relative increase of a time or a memory peak above which it is a regression.
+
+    Returns a pandas DataFrame with the baseline and current value of every measure, their ratio and
+    whether it is a regression.
+    """
+
+    with open(baseline) as file:
+        old = _flatten(json.load(file)["results"])
+    with open(current) as file:
+        new = _flatten(json.load(file)["results"])
+
+    comparison = pd.DataFrame({"baseline": pd.Series(old, dtype=np.float64), "current": pd.Series(new, dtype=np.float64)})
+    comparison["ratio"] = comparison["current"] / comparison["baseline"]
+    measured = comparison.index.str.endswith(("seconds", "bytes"))
+    comparison["regression"] = measured & (comparison["ratio"] > 1 + tolerance)
+
+    return comparison
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pairs trading benchmarks")
+    parser.add_argument("benchmark", nargs="?", default="cointegration", choices=["cointegration", "cold-start", "viewer", "pipeline"])
+    parser.add_argument("--bars", type=int, default=750)
+    parser.add_argument("--tickers", type=int, default=60)
+    parser.add_argument("--lags", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="a JSON file or a folder to save the results in")
+    parser.add_argument("--compare", help="a JSON file of an earlier run to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.benchmark == "cold-start":
+        results = benchmark_cold_start(args.repeat)
+    elif args.benchmark == "viewer":
+        results = benchmark_viewer(args.bars, args.repeat)
+    elif args.benchmark == "pipeline":
+        results = benchmark_pipeline(args.bars, args.tickers, args.repeat)
+    else:
+        results = benchmark_cointegration(args.bars, args.tickers, args.lags)
+
+    for name, value in _flatten(results).items():
+        print(f"{name}: {value}")
+
+    if args.output is not None or args.compare is not None:
+        output = args.output if args.output is not None else os.path.join(tempfile.gettempdir(), "benchmark.json")
+        output = save_results(args.benchmark, {"bars": args.bars, "tickers": args.tickers, "lags": args.lags,
+                                               "repeat": args.repeat}, results, output)
+        if args.compare is not None:
+            print(compare_results(args.compare, output, args.tolerance).to_string())
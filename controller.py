@@ -2,109 +2,349 @@
 ### Author: Joao Ramos Jungblut and Matheus Breitenbach
 ### Last update: 2023-04-13
 
-from dash import dash, dcc, html, Input, Output, State
-import pandas as pd
-import plotly.express as px
+import warnings
 
-import get_fin_data as gfd
-from pairs_methods import distance_approach as dist
-import backtest
-import viewer
-import ticket_list
+# dash, plotly, pandas and yfinance are imported when they are first needed, so importing this
+# module (in a worker or a test) and creating the app do not wait on them or on any download
 
 
-def main_pipe(ticker_name1: str, ticker_name2: str, start_date: str):
+# results of main_pipe, keyed by the pair, the start date and the parameters
+_pipe_cache = None
+
+
+def get_pipe_cache():
+    """
+    function to get the cache of main_pipe results, created on first use.
+    """
+
+    global _pipe_cache
+    if _pipe_cache is None:
+        import result_cache
+        _pipe_cache = result_cache.ResultCache()
+
+    return _pipe_cache
+
+
+def main_pipe(ticker_name1: str, ticker_name2: str, start_date: str, open_position: float = 1, close_position: float = 0,
+              pct_insample: float = 0.7, progress=None, return_series: bool = False):
+    """
+    function to download a pair, backtest it and build the figures of the dashboard.
+
+    parameters:
+        ticker_name1: a string with the name of the independent ticker.
+        ticker_name2: a string with the name of the dependent ticker.
+        start_date: a string with the first date of the period.
+        open_position: the Z-score where a position is opened.
+        close_position: the Z-score where a position is closed.
+        pct_insample: the size (percentage) of the in-sample.
+        progress: an optional function progress(done, total, label) called before each stage.
+        return_series: if True, returns (figures, series), where series is a dict with the full series
+            behind the figures, to plot them again over a zoomed range.
+
+    Results are kept in the pipe cache and computed again only when the prices change.
+    """
+
+    import get_fin_data as gfd
+    import instrument
+
+    progress = progress if progress is not None else _no_progress
+
+    with instrument.timer("main_pipe", pair=f"{ticker_name1}/{ticker_name2}", start_date=start_date):
+        # importing stocks
+        progress(0, 3, "Downloading prices")
+        with instrument.timer("main_pipe.download"):
+            prices, failures = gfd.get_close_prices([ticker_name1, ticker_name2], start_date)
+        if failures:
+            warnings.warn(f"Could not download {failures}")
+            return -1
+        prices = prices.dropna(how="any")
+
+        # the last bar identifies the data: a new date or a revised close gives a new version
+        key = (ticker_name1, ticker_name2, start_date, open_position, close_position, pct_insample)
+        version = (len(prices), str(prices.index[-1]), tuple(prices.iloc[-1])) if len(prices) else None
+        pipe_cache = get_pipe_cache()
+        result = pipe_cache.get(key, version)
+        instrument.count("pipe_cache.misses" if result is None else "pipe_cache.hits")
+        if result is None:
+            result = _compute_pipe(prices[ticker_name1].rename("Adj Close"), prices[ticker_name2].rename("Adj Close"),
+                                   ticker_name1, ticker_name2, open_position, close_position, pct_insample, progress)
+            pipe_cache.put(key, result, version)
+
+    return result if return_series else result[0]
+
+
+def _no_progress(done: int, total: int, label: str) -> None:
+    pass
+
+
+def _compute_pipe(stock1, stock2, ticker_name1: str, ticker_name2: str,
+                  open_position: float, close_position: float, pct_insample: float, progress):
     """
-    
+    function to backtest a pair and build the figures of the dashboard; returns (figures, series).
     """
 
-    # importing stocks
-    stock1 = gfd.get_close_price(ticker_name1, start_date)
-    stock2 = gfd.get_close_price(ticker_name2, start_date)
+    import pandas as pd
+    from pairs_methods import distance_approach as dist
+    import backtest
+    import viewer
+    import instrument
+
+    progress(1, 3, "Backtesting")
+    with instrument.timer("main_pipe.backtest", bars=len(stock1)):
+        # spliting train and test base
+        stock1_train, stock1_test = backtest.split_train_test(stock1, pct_insample)
+        stock2_train, stock2_test = backtest.split_train_test(stock2, pct_insample)
 
-    # spliting train and test base
-    stock1_train, stock1_test = backtest.split_train_test(stock1)
-    stock2_train, stock2_test = backtest.split_train_test(stock2)
+        # normalizing stocks
+        stock1_train_norm, stock1_test_norm = dist.normalize_series(stock1_train, stock1_test)
+        stock2_train_norm, stock2_test_norm = dist.normalize_series(stock2_train, stock2_test)
+        stock1_train_test_norm = pd.concat([stock1_train_norm, stock1_test_norm], axis=0)
+        stock2_train_test_norm = pd.concat([stock2_train_norm, stock2_test_norm], axis=0)
 
-    # normalizing stocks
-    stock1_train_norm, stock1_test_norm = dist.normalize_series(stock1_train, stock1_test)
-    stock2_train_norm, stock2_test_norm = dist.normalize_series(stock2_train, stock2_test)
-    stock1_train_test_norm = pd.concat([stock1_train_norm, stock1_test_norm], axis=0)
-    stock2_train_test_norm = pd.concat([stock2_train_norm, stock2_test_norm], axis=0)
+        # calculating spread
+        spread_train = dist.spread_distance(stock1_train_norm, stock2_train_norm)
+        spread_test = dist.spread_distance(stock1_test_norm, stock2_test_norm)
 
-    # calculating spread
-    spread_train = dist.spread_distance(stock1_train_norm, stock2_train_norm)
-    spread_test = dist.spread_distance(stock1_test_norm, stock2_test_norm)
+        # calculating z-score
+        z_score_train, z_score_test = dist.Z_score(spread_train, spread_test)
+        z_score_train_test = pd.concat([z_score_train, z_score_test], axis=0)
 
-    # calculating z-score
-    z_score_train, z_score_test = dist.Z_score(spread_train, spread_test)
-    z_score_train_test = pd.concat([z_score_train, z_score_test], axis=0)
+        # generating signal
+        signal = backtest.generate_signal(z_score_train_test, open_position, close_position)
 
-    # generating signal
-    signal = backtest.generate_signal(z_score_train_test, 1, 0)
+        # calculate stock returns
+        stock1_rtn = backtest.calculate_stock_return(stock1)
+        stock2_rtn = backtest.calculate_stock_return(stock2)
 
-    # calculate stock returns
-    stock1_rtn = backtest.calculate_stock_return(stock1)
-    stock2_rtn = backtest.calculate_stock_return(stock2)
+        # calculate trade return
+        trade_return = backtest.calculate_trade_return(signal, stock1_rtn, stock2_rtn)
+        cum_trade_return = backtest.calculate_compound_return(trade_return)
 
-    # calculate trade return
-    trade_return = backtest.calculate_trade_return(signal, stock1_rtn, stock2_rtn)
-    cum_trade_return = backtest.calculate_compound_return(trade_return)
+    progress(2, 3, "Building figures")
 
     # generating graphs
-    zscore_fig = viewer.generate_zscore_fig(z_score_train_test, signal, ticker_name1, ticker_name2)
-    normalized_price_fig = viewer.generate_normalized_fig(stock1_train_test_norm, stock2_train_test_norm, ticker_name1, ticker_name2)
-    trade_return_fig = viewer.generate_trade_returns_fig(cum_trade_return)
-    
-    return zscore_fig, normalized_price_fig, trade_return_fig
-
-
-zscore_fig, normalized_price_fig, trade_return_fig = main_pipe("PETR4.SA", "ITSA4.SA", "2021-01-01")
-
-
-app = dash.Dash(__name__)
-app.layout = html.Div(children=[
-    html.Div([
-        html.H1("Stocks"),
-        html.Label("Select ticker one", className='dropdown-labels'),
-        dcc.Dropdown(multi=False,
-                     id='ticker-1',
-                     options=ticket_list.TICKETS,
-                              value='PETR4.SA'),
-        html.Label("Select ticker two", className='dropdown-labels'), 
-        dcc.Dropdown(multi=False,
-                     id='ticker-2',
-                     options=ticket_list.TICKETS,
-                              value="ITSA4.SA"),
-        html.Button("Update", id="update_button"),
-        ]),
-    html.Div([
+    with instrument.timer("main_pipe.figures"):
+        figures = viewer.generate_figures(z_score_train_test.index, z_score_train_test.to_numpy(), signal.to_numpy(),
+                                          stock1_train_test_norm.to_numpy(), stock2_train_test_norm.to_numpy(),
+                                          cum_trade_return.to_numpy(), ticker_name1, ticker_name2)
+
+    series = {"z_score": z_score_train_test, "signal": signal, "stock1_norm": stock1_train_test_norm,
+              "stock2_norm": stock2_train_test_norm, "cum_trade_return": cum_trade_return}
+
+    return figures, series
+
+
+def zoom_figure(graph_id: str, ticker_name1: str, ticker_name2: str, start_date: str, x_range: tuple = None,
+                open_position: float = 1, close_position: float = 0, pct_insample: float = 0.7):
+    """
+    function to build one figure of the dashboard again, downsampled over the zoomed dates.
+
+    parameters:
+        graph_id: the id of the graph: 'zscore_graph', 'normalized_prices_graph' or 'return_graph'.
+        ticker_name1: a string with the name of the independent ticker.
+        ticker_name2: a string with the name of the dependent ticker.
+        start_date: a string with the first date of the period.
+        x_range: an optional (start, end) of the dates shown; None shows the whole period.
+        open_position, close_position, pct_insample: the parameters the pair was run with in main_pipe.
+
+    Only the series kept in the pipe cache by main_pipe are read: nothing is downloaded or computed
+    in the request thread, and -1 is returned when the pair is not cached.
+    """
+
+    import viewer
+    import instrument
+
+    key = (ticker_name1, ticker_name2, start_date, open_position, close_position, pct_insample)
+    result = get_pipe_cache().peek(key)
+    instrument.count("zoom.misses" if result is None else "zoom.hits")
+    if result is None:
+        return -1
+    _, series = result
+
+    with instrument.timer("zoom_figure", graph=graph_id, pair=f"{ticker_name1}/{ticker_name2}"):
+        if graph_id == "zscore_graph":
+            fig = viewer.generate_zscore_fig(series["z_score"], series["signal"], ticker_name1, ticker_name2, x_range=x_range)
+        elif graph_id == "normalized_prices_graph":
+            fig = viewer.generate_normalized_fig(series["stock1_norm"], series["stock2_norm"], ticker_name1, ticker_name2,
+                                                 x_range=x_range)
+        else:
+            fig = viewer.generate_trade_returns_fig(series["cum_trade_return"], x_range=x_range)
+
+    # keeps the zoomed view instead of fitting the axis to the points returned
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+
+    return fig
+
+
+def _relayout_range(relayout: dict):
+    """
+    function to read the dates shown from the relayoutData of a graph: (start, end), "full" when the
+    zoom was reset, or None when the x axis did not change.
+    """
+
+    if not relayout:
+        return None
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        return relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    if "xaxis.range" in relayout:
+        return tuple(relayout["xaxis.range"])
+    if relayout.get("xaxis.autorange"):
+        return "full"
+
+    return None
+
+
+# pipeline jobs of every session, run in the background of the server
+_job_queue = None
+
+
+def get_job_queue():
+    """
+    function to get the queue of pipeline jobs, created on first use.
+    """
+
+    global _job_queue
+    if _job_queue is None:
+        import jobs
+        _job_queue = jobs.JobQueue()
+
+    return _job_queue
+
+
+def create_app():
+    """
+    function to create the Dash app; the graphs start empty and are filled by the first callback.
+    """
+
+    from dash import dash, dcc, html, no_update, Input, Output, State
+    import ticket_list
+
+    app = dash.Dash(__name__)
+    app.layout = html.Div(children=[
+        html.Div([
+            html.H1("Stocks"),
+            html.Label("Select ticker one", className='dropdown-labels'),
+            dcc.Dropdown(multi=False,
+                         id='ticker-1',
+                         options=ticket_list.TICKETS,
+                                  value='PETR4.SA'),
+            html.Label("Select ticker two", className='dropdown-labels'), 
+            dcc.Dropdown(multi=False,
+                         id='ticker-2',
+                         options=ticket_list.TICKETS,
+                                  value="ITSA4.SA"),
+            html.Button("Update", id="update_button"),
+            html.Div(id='job_progress'),
+            dcc.Store(id='job_id'),
+            dcc.Store(id='shown_pair'),
+            dcc.Interval(id='job_poll', interval=500, disabled=True),
+            ]),
         html.Div([
-            dcc.Graph(figure=zscore_fig, id='zscore_graph'),
-        ])
-    ]),
-    html.Div([
+            html.Div([
+                dcc.Graph(figure={}, id='zscore_graph'),
+            ])
+        ]),
         html.Div([
-            dcc.Graph(figure=normalized_price_fig, id='normalized_prices_graph'),
-        ])
-    ]),
-    html.Div([
+            html.Div([
+                dcc.Graph(figure={}, id='normalized_prices_graph'),
+            ])
+        ]),
         html.Div([
-            dcc.Graph(figure=trade_return_fig, id='return_graph'),
-        ])
-    ]),
-])
-
-
-@app.callback(
-    [Output(component_id='zscore_graph', component_property='figure'), 
-     Output(component_id='normalized_prices_graph', component_property='figure'),
-     Output(component_id='return_graph', component_property='figure')],
-    [Input(component_id='update_button', component_property='n_clicks')],
-    [State(component_id='ticker-1',component_property='value'),
-     State(component_id='ticker-2',component_property='value')],
-    prevent_initial_call=True
-    )
-def generate_graph(n, stock1, stock2):
-    zscore_fig, normalized_price_fig, trade_return_fig = main_pipe(stock1, stock2, "2021-01-01")
-    return [zscore_fig, normalized_price_fig, trade_return_fig]
\ No newline at end of file
+            html.Div([
+                dcc.Graph(figure={}, id='return_graph'),
+            ])
+        ]),
+    ])
+
+
+    # runs on page load too, so the default pair is computed once the page is already shown;
+    # clicking Update again cancels the job this session was waiting for
+    @app.callback(
+        Output(component_id='job_id', component_property='data'),
+        [Input(component_id='update_button', component_property='n_clicks')],
+        [State(component_id='ticker-1',component_property='value'),
+         State(component_id='ticker-2',component_property='value'),
+         State(component_id='job_id', component_property='data')],
+        )
+    def start_graph_job(n, stock1, stock2, previous_job_id):
+        job_queue = get_job_queue()
+        if previous_job_id is not None:
+            job_queue.cancel(previous_job_id)
+        return job_queue.submit((stock1, stock2, "2021-01-01"), main_pipe, stock1, stock2, "2021-01-01")
+
+
+    @app.callback(
+        [Output(component_id='zscore_graph', component_property='figure'), 
+         Output(component_id='normalized_prices_graph', component_property='figure'),
+         Output(component_id='return_graph', component_property='figure'),
+         Output(component_id='job_progress', component_property='children'),
+         Output(component_id='job_poll', component_property='disabled'),
+         Output(component_id='shown_pair', component_property='data')],
+        [Input(component_id='job_id', component_property='data'),
+         Input(component_id='job_poll', component_property='n_intervals')],
+        prevent_initial_call=True
+        )
+    def generate_graph(job_id, n):
+        job_queue = get_job_queue()
+        job = job_queue.get(job_id)
+        if job is None:
+            return no_update, no_update, no_update, "", True, no_update
+        if job.status == "running":
+            done, total, label = job.progress
+            return no_update, no_update, no_update, f"{label} ({done + 1}/{total})", False, no_update
+
+        job_queue.release(job_id)
+        if job.status == "done" and job.future.result() != -1:
+            zscore_fig, normalized_price_fig, trade_return_fig = job.future.result()
+            return zscore_fig, normalized_price_fig, trade_return_fig, "", True, list(job.key)
+        return no_update, no_update, no_update, "Could not update the graphs", True, no_update
+
+
+    # zooming a graph plots it again from the full series, downsampled over the dates shown
+    def add_zoom_callback(graph_id):
+        @app.callback(
+            Output(component_id=graph_id, component_property='figure', allow_duplicate=True),
+            [Input(component_id=graph_id, component_property='relayoutData')],
+            [State(component_id='shown_pair', component_property='data')],
+            prevent_initial_call=True
+            )
+        def zoom_graph(relayout, shown_pair):
+            x_range = _relayout_range(relayout)
+            if x_range is None or shown_pair is None:
+                return no_update
+            fig = zoom_figure(graph_id, *shown_pair, x_range=None if x_range == "full" else x_range)
+            return no_update if isinstance(fig, int) else fig
+
+    for graph_id in ('zscore_graph', 'normalized_prices_graph', 'return_graph'):
+        add_zoom_callback(graph_id)
+
+
+    # metrics of the pipeline stages, in the Prometheus text format or as JSON with ?format=json;
+    # stages are only timed once instrument.enable is called or PAIRS_INSTRUMENT is set
+    @app.server.route('/metrics')
+    def metrics():
+        from flask import Response, jsonify, request
+        import instrument
+
+        gauges = {}
+        if _pipe_cache is not None:
+            gauges.update({f"pipe_cache_{name}": value for name, value in _pipe_cache.stats().items()})
+        if request.args.get('format') == 'json':
+            return jsonify(dict(instrument.metrics(), gauges=gauges))
+        return Response(instrument.prometheus_text(gauges), mimetype='text/plain; version=0.0.4')
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name):
+    # controller.app is created on first access, as used by __main__ and WSGI servers
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
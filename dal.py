@@ -1,38 +1,606 @@
-### Backtest module
+### Data access layer module
 ### Author: Joao Ramos Jungblut and Matheus Breitenbach
-### Last update: 2023-03-08
+### Last update: 2026-10-18
 
 import pandas as pd
+import numpy as np
 import warnings
+import json
 import os
-
+import tempfile
+import threading
 
 
 
 def import_data(data_name: str) -> pd.DataFrame:
     try:
-        data = pd.read_csv(f"./data/{data_name}.csv")    
+        data = pd.read_csv(f"./data/{data_name}.csv")
     except: #file not found
         warnings.warn("File not found or incorrect path")
         return -1
-        
+
     return data
 
 
 def export_data(data: pd.core.series, data_name: str) -> None:
-    pasta = './data'
-    files = []
-
-    for diretorio, subpastas, arquivos in os.walk(pasta):
-        for arquivo in arquivos:
-            files.append(arquivo)
-            
-    if f"{data_name}.csv" in files:
-        data_saved = import_data(f"./data/{data_name}.csv")
+    path = f"./data/{data_name}.csv"
+
+    if os.path.isfile(path):
+        data_saved = import_data(data_name)
         data_full = pd.concat([data_saved, data], axis=0)
-        data_full.to_csv(path_or_buf=f"./data/{data_name}.csv", index=True)
+        data_full.to_csv(path_or_buf=path, index=True)
     else:
-        data.to_csv(path_or_buf=f"./data/{data_name}.csv", index=True)
+        data.to_csv(path_or_buf=path, index=True)
+
+
+
+# Columnar store: one raw binary file per column, partitioned by ticker and year,
+#   {root}/{ticker}/_schema.json
+#   {root}/{ticker}/{year}/Date.bin      int64 nanoseconds since epoch, sorted
+#   {root}/{ticker}/{year}/{column}.bin  one value per date
+# Appending writes only the new rows at the end of the files of their year.
+STORE_ROOT = "./data/store"
+
+
+
+def _read_schema(ticker: str, root: str) -> dict:
+    try:
+        with open(os.path.join(root, ticker, "_schema.json")) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+
+def _years(ticker: str, root: str) -> list:
+    try:
+        return sorted(int(name) for name in os.listdir(os.path.join(root, ticker)) if name.isdigit())
+    except FileNotFoundError:
+        return []
+
+
+
+def _read_dates(ticker: str, year: int, root: str) -> np.ndarray:
+    # a year whose first append stopped before its dates were written has no rows yet
+    try:
+        return np.fromfile(os.path.join(root, ticker, str(year), "Date.bin"), dtype=np.int64)
+    except FileNotFoundError:
+        return np.empty(0, dtype=np.int64)
+
+
+
+def _truncate_columns(folder: str, schema: dict, n_rows: int) -> None:
+    """
+    function to cut the column files of a year to the n_rows rows of its dates file.
+    """
+
+    for column, dtype in schema["columns"].items():
+        path = os.path.join(folder, f"{column}.bin")
+        size = n_rows * np.dtype(dtype).itemsize
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+
+
+def append_data(data: pd.DataFrame, ticker: str, root: str = STORE_ROOT) -> int:
+    """
+    function to append rows of a ticker to the columnar store.
+
+    parameters:
+        data: a pandas DataFrame or Series indexed by date.
+        ticker: a string with the name of the ticker.
+        root: the folder of the store.
+
+    Rows at or before the last stored date are skipped, so appending an overlapping download
+    is safe. Returns the number of rows written.
+    """
+
+    try:
+        data = data.to_frame() if isinstance(data, pd.Series) else data
+        data = data.sort_index()
+        dates = pd.DatetimeIndex(data.index).as_unit("ns").asi8
+
+        schema = _read_schema(ticker, root)
+        if schema is None:
+            schema = {"columns": {str(column): np.dtype(dtype).str for column, dtype in data.dtypes.items()}}
+            os.makedirs(os.path.join(root, ticker), exist_ok=True)
+            with open(os.path.join(root, ticker, "_schema.json"), "w") as file:
+                json.dump(schema, file)
+        elif set(schema["columns"]) != set(map(str, data.columns)):
+            raise ValueError(f"columns of {ticker} are {list(schema['columns'])}")
+
+        years = _years(ticker, root)
+        # from the last year with rows on, rows left in the columns by an append that stopped
+        # before its dates were written are dropped
+        for year in reversed(years):
+            stored_dates = _read_dates(ticker, year, root)
+            _truncate_columns(os.path.join(root, ticker, str(year)), schema, len(stored_dates))
+            if len(stored_dates):
+                keep = dates > stored_dates[-1]
+                data, dates = data.loc[keep], dates[keep]
+                break
+
+        # every column is converted before any file is opened, so a bad column writes nothing
+        values = {column: data[column].to_numpy(dtype=dtype) for column, dtype in schema["columns"].items()}
+
+        row_years = data.index.year
+        for year in np.unique(row_years):
+            in_year = row_years == year
+            folder = os.path.join(root, ticker, str(year))
+            os.makedirs(folder, exist_ok=True)
+
+            # values first and dates last: the dates file tells which rows are complete
+            for column in schema["columns"]:
+                with open(os.path.join(folder, f"{column}.bin"), "ab") as file:
+                    values[column][in_year].tofile(file)
+            with open(os.path.join(folder, "Date.bin"), "ab") as file:
+                dates[in_year].tofile(file)
+    except (TypeError, AttributeError, ValueError) as error:
+        warnings.warn(f"Could not append {ticker}: {error}")
+        return -1
+
+    return len(dates)
+
+
+
+def read_data(ticker: str, columns: list = None, start_date: str = None, end_date: str = None,
+              root: str = STORE_ROOT) -> pd.DataFrame:
+    """
+    function to read a ticker from the columnar store.
+
+    parameters:
+        ticker: a string with the name of the ticker.
+        columns: the columns to read; all of them by default.
+        start_date: a string with the first date to read.
+        end_date: a string with the last date to read (inclusive).
+        root: the folder of the store.
+
+    Only the years between start_date and end_date are opened, and only the bytes of the
+    requested dates and columns are read.
+    """
+
+    try:
+        schema = _read_schema(ticker, root)
+        if schema is None:
+            raise FileNotFoundError(ticker)
+        columns = list(schema["columns"]) if columns is None else list(columns)
+        start = pd.Timestamp(start_date).as_unit("ns").value if start_date is not None else np.iinfo(np.int64).min
+        end = pd.Timestamp(end_date).as_unit("ns").value if end_date is not None else np.iinfo(np.int64).max
+
+        dates, values = [], {column: [] for column in columns}
+        for year in _years(ticker, root):
+            if (start_date is not None and year < pd.Timestamp(start_date).year) or \
+               (end_date is not None and year > pd.Timestamp(end_date).year):
+                continue
+
+            year_dates = _read_dates(ticker, year, root)
+            first = np.searchsorted(year_dates, start, side="left")
+            last = np.searchsorted(year_dates, end, side="right")
+            if last == first:
+                continue
+            dates.append(year_dates[first:last])
+            for column in columns:
+                dtype = np.dtype(schema["columns"][column])
+                values[column].append(np.fromfile(os.path.join(root, ticker, str(year), f"{column}.bin"), dtype=dtype,
+                                                  count=last - first, offset=first * dtype.itemsize))
+
+        index = pd.DatetimeIndex(np.concatenate(dates).astype("datetime64[ns]") if dates else [], name="Date")
+        data = pd.DataFrame({column: np.concatenate(values[column]) if dates else [] for column in columns}, index=index)
+    except (TypeError, AttributeError, ValueError, KeyError, FileNotFoundError) as error:
+        warnings.warn(f"Could not read {ticker}: {error}")
+        return -1
+
+    return data
+
+
+
+def load_aligned(tickers: list, column: str = "Adj Close", start_date: str = None, end_date: str = None,
+                 root: str = STORE_ROOT) -> pd.DataFrame:
+    """
+    function to load one column of many tickers aligned on their dates.
+
+    parameters:
+        tickers: a list with the names of the tickers.
+        column: the column to load.
+        start_date: a string with the first date to read.
+        end_date: a string with the last date to read (inclusive).
+        root: the folder of the store.
+
+    Returns a pandas DataFrame (dates x tickers), NaN where a ticker has no value.
+    """
+
+    series = {}
+    for ticker in tickers:
+        data = read_data(ticker, [column], start_date, end_date, root)
+        if isinstance(data, pd.DataFrame):
+            series[ticker] = data[column]
+
+    return pd.concat(series, axis=1).rename_axis("Date") if series else pd.DataFrame()
+
+
+
+# Price panel: every ticker aligned on one calendar, in a file that is memory-mapped on open,
+#   {path}/meta.json   dtype, block_rows, n_rows and tickers
+#   {path}/dates.bin   int64 nanoseconds since epoch, one per row
+#   {path}/values.bin  blocks of block_rows dates, each stored ticker by ticker (tickers x block_rows)
+# A ticker is contiguous inside a block, so reading it pages in only its own bytes, and new rows
+# fill the last block in place (or append a new one) without rewriting the file.
+class PricePanel:
+    """
+    memory-mapped price panel opened by open_panel.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as file:
+            meta = json.load(file)
+
+        self.path = path
+        self.tickers = meta["tickers"]
+        self.n_rows = meta["n_rows"]
+        self.block_rows = meta["block_rows"]
+        self.dtype = np.dtype(meta["dtype"])
+        self.dates = pd.DatetimeIndex(np.fromfile(os.path.join(path, "dates.bin"), dtype=np.int64, count=self.n_rows)
+                                      .astype("datetime64[ns]"), name="Date")
+        self._position = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        n_blocks = -(-self.n_rows // self.block_rows)
+        self.values = np.memmap(os.path.join(path, "values.bin"), dtype=self.dtype, mode="r",
+                                shape=(n_blocks, len(self.tickers), self.block_rows)) if n_blocks else \
+                      np.empty((0, len(self.tickers), self.block_rows), dtype=self.dtype)
+
+    def column(self, ticker: str) -> np.ndarray:
+        """
+        the prices of one ticker on every date of the panel.
+        """
+
+        return self.values[:, self._position[ticker], :].reshape(-1)[:self.n_rows]
+
+    def frame(self, tickers: list = None, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        a pandas DataFrame (dates x tickers) with some tickers between two dates (inclusive).
+        """
+
+        tickers = self.tickers if tickers is None else list(tickers)
+        first = self.dates.searchsorted(pd.Timestamp(start_date)) if start_date is not None else 0
+        last = self.dates.searchsorted(pd.Timestamp(end_date), side="right") if end_date is not None else self.n_rows
+
+        # only the blocks holding rows first..last of the selected tickers are touched
+        first_block, last_block = first // self.block_rows, -(-last // self.block_rows)
+        columns = [self._position[ticker] for ticker in tickers]
+        blocks = self.values[first_block:last_block][:, columns, :]
+        rows = blocks.transpose(0, 2, 1).reshape(-1, len(columns))
+        offset = first_block * self.block_rows
+
+        return pd.DataFrame(rows[first - offset:last - offset], index=self.dates[first:last], columns=tickers)
+
+
+
+def _write_panel_rows(path: str, meta: dict, prices: pd.DataFrame) -> None:
+    tickers, block_rows, dtype = meta["tickers"], meta["block_rows"], np.dtype(meta["dtype"])
+    values = prices.reindex(columns=tickers).to_numpy(dtype=dtype)
+    first, last = meta["n_rows"], meta["n_rows"] + len(values)
+    block_bytes = len(tickers) * block_rows * dtype.itemsize
+
+    # grow the file by whole blocks of NaN, then write the rows in place
+    values_path = os.path.join(path, "values.bin")
+    n_blocks = -(-last // block_rows)
+    missing_blocks = n_blocks - os.path.getsize(values_path) // block_bytes
+    if missing_blocks > 0:
+        with open(values_path, "ab") as file:
+            np.full(missing_blocks * len(tickers) * block_rows, np.nan, dtype=dtype).tofile(file)
+
+    if len(values):
+        first_block = first // block_rows
+        blocks = np.memmap(values_path, dtype=dtype, mode="r+", offset=first_block * block_bytes,
+                           shape=(n_blocks - first_block, len(tickers), block_rows))
+        rows = np.arange(first, last) - first_block * block_rows
+        blocks[rows // block_rows, :, rows % block_rows] = values
+        blocks.flush()
+        del blocks
+
+    with open(os.path.join(path, "dates.bin"), "ab") as file:
+        pd.DatetimeIndex(prices.index).as_unit("ns").asi8.tofile(file)
+
+    # the row count is updated last, so readers never see rows that are not written yet
+    meta["n_rows"] = last
+    with open(os.path.join(path, "meta.json.tmp"), "w") as file:
+        json.dump(meta, file)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+
+
+def build_panel(prices: pd.DataFrame, path: str, dtype=np.float64, block_rows: int = 4096) -> PricePanel:
+    """
+    function to write a new price panel.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers), for example from load_aligned.
+        path: the folder of the panel; an existing panel there is replaced.
+        dtype: np.float64 or np.float32.
+        block_rows: the number of dates in each block of the file.
+    """
+
+    try:
+        os.makedirs(path, exist_ok=True)
+        for name in ("values.bin", "dates.bin"):
+            open(os.path.join(path, name), "wb").close()
+        meta = {"dtype": np.dtype(dtype).str, "block_rows": block_rows, "n_rows": 0,
+                "tickers": [str(ticker) for ticker in prices.columns]}
+        _write_panel_rows(path, meta, prices.sort_index())
+    except (TypeError, AttributeError, ValueError) as error:
+        warnings.warn(f"Could not build the panel: {error}")
+        return -1
+
+    return PricePanel(path)
+
+
+
+def update_panel(prices: pd.DataFrame, path: str) -> int:
+    """
+    function to append new dates to a price panel without rewriting it.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers); dates at or before the last one of the panel are skipped
+            and tickers not in the panel are ignored.
+        path: the folder of the panel.
+
+    Returns the number of rows appended.
+    """
+
+    try:
+        with open(os.path.join(path, "meta.json")) as file:
+            meta = json.load(file)
+        prices = prices.sort_index()
+        if meta["n_rows"]:
+            last_date = np.fromfile(os.path.join(path, "dates.bin"), dtype=np.int64, count=1,
+                                    offset=(meta["n_rows"] - 1) * 8)[0]
+            prices = prices.loc[pd.DatetimeIndex(prices.index).as_unit("ns").asi8 > last_date]
+        _write_panel_rows(path, meta, prices)
+    except (TypeError, AttributeError, ValueError, FileNotFoundError) as error:
+        warnings.warn(f"Could not update the panel: {error}")
+        return -1
+
+    return len(prices)
+
+
+
+def open_panel(path: str) -> PricePanel:
+    """
+    function to open a price panel; prices are only read from disk when they are used.
+
+    parameters:
+        path: the folder of the panel.
+    """
+
+    try:
+        panel = PricePanel(path)
+    except (TypeError, ValueError, KeyError, FileNotFoundError) as error:
+        warnings.warn(f"Could not open the panel: {error}")
+        return -1
+
+    return panel
+
+
+
+# Intraday store: one page per UTC day and bar size, memory-mapped on read,
+#   {root}/{interval}/_tickers.json             the tickers of the store, new ones appended at the end
+#   {root}/{interval}/{YYYY-MM-DD}.times.npy    int64 nanoseconds since epoch, one per bar, sorted
+#   {root}/{interval}/{YYYY-MM-DD}.values.npy   float32 closes (tickers x bars), a ticker contiguous
+# A page holds the tickers known when it was written; tickers added later read as NaN in older pages.
+INTRADAY_ROOT = "./data/intraday"
+_DAY_NS = 86400 * 10**9
+
+# the pages and the ticker list are read, merged and written back, one writer thread at a time
+_intraday_lock = threading.Lock()
+
+
+
+class IntradayPanel:
+    """
+    intraday closes of many tickers on one time axis, as returned by read_intraday.
+
+    parameters:
+        times: a numpy array of int64 nanoseconds since epoch (UTC), the start of each bar.
+        values: a float32 numpy array (bars x tickers) of closes.
+        tickers: the names of the columns of values.
+        interval: the bar size, such as "1m" or "15m".
+
+    Backtest and distance functions take values (or column) directly; index and frame build
+    pandas objects only when they are needed.
+    """
+
+    def __init__(self, times: np.ndarray, values: np.ndarray, tickers: list, interval: str):
+        self.times = times
+        self.values = values
+        self.tickers = list(tickers)
+        self.interval = interval
+        self._position = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def column(self, ticker: str) -> np.ndarray:
+        return self.values[:, self._position[ticker]]
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.times.astype("datetime64[ns]"), name="Datetime")
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.index, columns=self.tickers)
+
+    def resample(self, interval: str) -> "IntradayPanel":
+        """
+        the panel in coarser bars: each bar starts at a multiple of interval and closes at the last price in it.
+
+        parameters:
+            interval: the new bar size, such as "5m" or "1h".
+        """
+
+        import get_fin_data as gfd
+
+        step = gfd.interval_seconds(interval) * 10**9
+        if len(self.times) == 0:
+            return IntradayPanel(self.times, self.values, self.tickers, interval)
+
+        buckets = self.times // step
+        ends = np.flatnonzero(np.diff(buckets)) + 1
+        starts = np.concatenate([[0], ends])
+        ends = np.concatenate([ends, [len(buckets)]]) - 1
+
+        # the position of the last valid price of each ticker up to each bar, -1 before the first one
+        last_valid = np.where(np.isnan(self.values), -1, np.arange(len(self.times))[:, np.newaxis])
+        last_valid = np.maximum.accumulate(last_valid, axis=0)[ends]
+        in_bucket = last_valid >= starts[:, np.newaxis]
+        values = np.where(in_bucket, self.values[np.maximum(last_valid, 0), np.arange(len(self.tickers))], np.nan)
 
+        return IntradayPanel(buckets[starts] * step, values.astype(self.values.dtype), self.tickers, interval)
 
 
+
+def _intraday_tickers(folder: str) -> list:
+    try:
+        with open(os.path.join(folder, "_tickers.json")) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return []
+
+
+
+def _intraday_days(folder: str) -> list:
+    try:
+        return sorted(name[:-len(".times.npy")] for name in os.listdir(folder) if name.endswith(".times.npy"))
+    except FileNotFoundError:
+        return []
+
+
+
+def _replace_file(path: str, write) -> None:
+    # a file of its own for every writer, threads and processes included, then renamed over path at once
+    descriptor, temporary = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            write(file)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+
+def _save_npy(path: str, array: np.ndarray) -> None:
+    _replace_file(path, lambda file: np.save(file, array))
+
+
+
+def write_intraday(prices: pd.DataFrame, interval: str = "1m", root: str = INTRADAY_ROOT) -> int:
+    """
+    function to write intraday closes to the store, one page per day.
+
+    parameters:
+        prices: a pandas DataFrame (UTC times x tickers), for example from get_fin_data.get_intraday_prices.
+        interval: the bar size of the prices.
+        root: the folder of the store.
+
+    A day already in the store is merged with the new bars, which win where both have a price.
+    Returns the number of bars written.
+    """
+
+    try:
+        with _intraday_lock:
+            folder = os.path.join(root, interval)
+            os.makedirs(folder, exist_ok=True)
+            prices = prices.sort_index()
+            tickers = _intraday_tickers(folder)
+            new_tickers = [str(ticker) for ticker in prices.columns if str(ticker) not in tickers]
+            if new_tickers:
+                tickers = tickers + new_tickers
+                _replace_file(os.path.join(folder, "_tickers.json"), lambda file: file.write(json.dumps(tickers).encode()))
+
+            times = pd.DatetimeIndex(prices.index).as_unit("ns").asi8
+            values = prices.set_axis(prices.columns.astype(str), axis=1).reindex(columns=tickers).to_numpy(dtype=np.float32)
+            days = times // _DAY_NS
+            bounds = np.flatnonzero(np.diff(days)) + 1
+
+            for day_times, day_values in zip(np.split(times, bounds), np.split(values, bounds)):
+                day = str(np.datetime64(int(day_times[0] // _DAY_NS), "D"))
+                times_path = os.path.join(folder, f"{day}.times.npy")
+                values_path = os.path.join(folder, f"{day}.values.npy")
+
+                if os.path.isfile(times_path):
+                    stored_times = np.load(times_path)
+                    stored_values = np.full((len(stored_times), len(tickers)), np.nan, dtype=np.float32)
+                    stored = np.load(values_path)
+                    stored_values[:, :len(stored)] = stored.T
+
+                    merged_times = np.union1d(stored_times, day_times)
+                    merged = np.full((len(merged_times), len(tickers)), np.nan, dtype=np.float32)
+                    merged[np.searchsorted(merged_times, stored_times)] = stored_values
+                    rows = np.searchsorted(merged_times, day_times)
+                    merged[rows] = np.where(np.isnan(day_values), merged[rows], day_values)
+                    day_times, day_values = merged_times, merged
+
+                # values first and times last: a reader takes the number of bars from the times file
+                _save_npy(values_path, np.ascontiguousarray(day_values.T))
+                _save_npy(times_path, day_times)
+    except (TypeError, AttributeError, ValueError) as error:
+        warnings.warn(f"Could not write the intraday prices: {error}")
+        return -1
+
+    return len(times)
+
+
+
+def read_intraday(tickers: list = None, start_date: str = None, end_date: str = None, interval: str = "1m",
+                  resample: str = None, root: str = INTRADAY_ROOT) -> IntradayPanel:
+    """
+    function to read intraday closes of many tickers from the store.
+
+    parameters:
+        tickers: the tickers to read; all of them by default.
+        start_date: a string with the first date (or time) to read.
+        end_date: a string with the last date to read (inclusive).
+        interval: the bar size stored.
+        resample: an optional coarser bar size to return, such as "15m" or "1h".
+        root: the folder of the store.
+
+    Only the pages of the requested days are opened, memory-mapped, and only the rows of the
+    requested tickers are copied.
+    """
+
+    try:
+        folder = os.path.join(root, interval)
+        stored_tickers = _intraday_tickers(folder)
+        tickers = stored_tickers if tickers is None else [str(ticker) for ticker in tickers]
+        columns = np.array([stored_tickers.index(ticker) for ticker in tickers], dtype=np.int64)
+        start = pd.Timestamp(start_date).as_unit("ns").value if start_date is not None else np.iinfo(np.int64).min
+        end = pd.Timestamp(end_date).as_unit("ns").value if end_date is not None else np.iinfo(np.int64).max
+        # a date without a time includes the whole day
+        if end_date is not None and pd.Timestamp(end_date) == pd.Timestamp(end_date).normalize():
+            end += _DAY_NS - 1
+
+        times, values = [], []
+        for day in _intraday_days(folder):
+            day_start = np.datetime64(day, "ns").astype(np.int64)
+            if day_start + _DAY_NS <= start or day_start > end:
+                continue
+
+            day_times = np.load(os.path.join(folder, f"{day}.times.npy"))
+            day_values = np.load(os.path.join(folder, f"{day}.values.npy"), mmap_mode="r")
+            first, last = np.searchsorted(day_times, start, side="left"), np.searchsorted(day_times, end, side="right")
+
+            page = np.full((last - first, len(tickers)), np.nan, dtype=np.float32)
+            in_page = columns < day_values.shape[0]
+            page[:, in_page] = day_values[columns[in_page], first:last].T
+            times.append(day_times[first:last])
+            values.append(page)
+
+        panel = IntradayPanel(np.concatenate(times) if times else np.empty(0, dtype=np.int64),
+                              np.concatenate(values) if values else np.empty((0, len(tickers)), dtype=np.float32),
+                              tickers, interval)
+    except (TypeError, AttributeError, ValueError, FileNotFoundError) as error:
+        warnings.warn(f"Could not read the intraday prices: {error}")
+        return -1
+
+    return panel.resample(resample) if resample is not None else panel
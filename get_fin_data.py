@@ -1,29 +1,378 @@
 ### Module to import, manipulate and export finance data
 ### Author: Joao Ramos Jungblut and Matheus Breitenbach
-### Last update: 2023-03-08
+### Last update: 2026-10-18
 
-import yfinance as yf
 import pandas as pd
+import numpy as np
 import datetime
+import os
+import tempfile
+import time
+import zlib
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
+import instrument
 
 
-default_end_date = str(datetime.date.today())
+# bar sizes of intraday prices, from 1 minute up: "1m", "5m", "15m", "1h", ...
+_INTERVAL_UNITS = {"m": 60, "h": 3600, "d": 86400}
 
-def get_close_price(ticker: str, start_date: str, end_date: str = default_end_date) -> pd.core.series.Series:
+def interval_seconds(interval: str) -> int:
+    """
+    function to get the number of seconds of a bar size such as "1m", "15m" or "1h".
+
+    parameters:
+        interval: a string with a positive number and a unit: m (minutes), h (hours) or d (days).
+    """
+
+    number, unit = interval[:-1], interval[-1:]
+    if unit not in _INTERVAL_UNITS or not number.isdigit() or int(number) == 0:
+        raise ValueError(f"{interval} is not a bar size such as '1m', '15m' or '1h'.")
+
+    return int(number) * _INTERVAL_UNITS[unit]
+
+
+
+def _utc_naive(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    # intraday timestamps are kept in UTC without a time zone
+    return index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index
+
+
+
+class YahooProvider:
+    """
+    provider of adjusted close prices from the yfinance package.
+    """
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def fetch(self, ticker: str, start_date: str, end_date: str) -> pd.core.series.Series:
+        import yfinance as yf
+
+        x = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=False, session=self.session)
+        x = x.loc[:, "Adj Close"]
+        if isinstance(x, pd.DataFrame):
+            x = x.iloc[:, 0]
+        x.index.name = "Date"
+
+        return x.rename("Adj Close")
+
+    def fetch_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> pd.core.series.Series:
+        import yfinance as yf
+
+        x = yf.download(ticker, start=start_date, end=end_date, interval=interval, progress=False, auto_adjust=False,
+                        session=self.session)
+        x = x.loc[:, "Close"]
+        if isinstance(x, pd.DataFrame):
+            x = x.iloc[:, 0]
+        x.index = _utc_naive(pd.DatetimeIndex(x.index))
+        x.index.name = "Datetime"
+
+        return x.rename("Close")
+
+
+
+class FileProvider:
+    """
+    provider of adjusted close prices from csv files named {ticker}.csv with Date and Adj Close columns,
+    and of intraday prices from files named {ticker}_{interval}.csv with Datetime (UTC) and Close columns.
+    """
+
+    def __init__(self, directory: str = "./data"):
+        self.directory = directory
+
+    def fetch(self, ticker: str, start_date: str, end_date: str) -> pd.core.series.Series:
+        x = pd.read_csv(os.path.join(self.directory, f"{ticker}.csv"), index_col="Date", parse_dates=True)
+        x = x.loc[(x.index >= start_date) & (x.index < end_date), "Adj Close"]
+
+        return x.rename("Adj Close")
+
+    def fetch_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> pd.core.series.Series:
+        x = pd.read_csv(os.path.join(self.directory, f"{ticker}_{interval}.csv"), index_col="Datetime", parse_dates=True)
+        x.index = _utc_naive(pd.DatetimeIndex(x.index))
+        x = x.loc[(x.index >= start_date) & (x.index < end_date), "Close"]
+
+        return x.rename("Close")
+
+
+
+class SyntheticProvider:
+    """
+    provider of random walk prices on business days, the same for a ticker on every call; used offline.
+    Intraday bars cover a 13:00 to 20:00 UTC session and start each day from the close of the day before.
+    """
+
+    SESSION_START = 13 * 3600
+    SESSION_MINUTES = 420
+
+    def __init__(self, seed: int = 0, origin: str = "2000-01-03"):
+        self.seed = seed
+        self.origin = origin
+
+    def fetch(self, ticker: str, start_date: str, end_date: str) -> pd.core.series.Series:
+        days = np.arange(np.datetime64(self.origin, "D"), np.datetime64(str(pd.Timestamp(end_date).date()), "D"))
+        dates = pd.DatetimeIndex(days[np.is_busday(days)].astype("datetime64[ns]"), name="Date")
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        prices = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        x = pd.Series(prices, index=dates, name="Adj Close")
+
+        return x.loc[start_date:]
+
+    def fetch_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> pd.core.series.Series:
+        step = interval_seconds(interval) // 60
+        daily = self.fetch(ticker, self.origin, end_date)
+        days = daily.index.values.astype("datetime64[D]")
+        previous_close = np.concatenate([[20.0], daily.to_numpy()[:-1]])
+        in_period = days >= np.datetime64(str(pd.Timestamp(start_date).date()), "D")
+
+        # a minute path per day, seeded by the day, so every bar size and period gives the same prices
+        minutes = np.arange(step - 1, self.SESSION_MINUTES, step)
+        prices = np.empty((in_period.sum(), len(minutes)))
+        for row, (day, close) in enumerate(zip(days[in_period], previous_close[in_period])):
+            rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), int(day.astype(np.int64))])
+            path = close * np.exp(np.cumsum(rng.normal(0, 0.02 / np.sqrt(self.SESSION_MINUTES), self.SESSION_MINUTES)))
+            prices[row] = path[minutes]
+
+        # bars are labelled by the time they start
+        seconds = days[in_period].astype("datetime64[s]").astype(np.int64)[:, np.newaxis] + self.SESSION_START + \
+                  (minutes - step + 1) * 60
+        index = pd.DatetimeIndex(seconds.ravel().astype("datetime64[s]").astype("datetime64[ns]"), name="Datetime")
+        x = pd.Series(prices.ravel(), index=index, name="Close")
+
+        return x.loc[(x.index >= start_date) & (x.index < end_date)]
+
+
+
+class PriceCache:
+    """
+    on-disk cache of adjusted close prices in front of a provider, with one file per ticker.
+
+    parameters:
+        provider: the provider used on a cache miss; YahooProvider by default.
+        directory: the folder of the cache files.
+        ttl: seconds after which a cached bar of the current day is downloaded again.
+
+    Only the dates not covered yet are requested from the provider: the head before the first
+    cached date and the tail after the last one. A PriceCache is a provider itself.
+    """
+
+    def __init__(self, provider=None, directory: str = "./data/cache", ttl: float = 900):
+        self.provider = provider if provider is not None else YahooProvider()
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.directory, f"{ticker}.npz")
+
+    def _load(self, ticker: str):
+        try:
+            with np.load(self._path(ticker)) as stored:
+                x = pd.Series(stored["values"], index=pd.DatetimeIndex(stored["dates"], name="Date"), name="Adj Close")
+                return x, str(stored["start"]), str(stored["end"]), float(stored["fetched_at"])
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            return None
+
+    def _save(self, ticker: str, x: pd.core.series.Series, start: str, end: str, fetched_at: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # a file of its own for every writer, threads included, then renamed over the cache file at once
+        descriptor, temporary = tempfile.mkstemp(prefix=f"{ticker}.", suffix=".tmp.npz", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                np.savez(file, dates=x.index.values.astype("datetime64[ns]"), values=x.to_numpy(dtype=np.float64),
+                         start=start, end=end, fetched_at=fetched_at)
+            os.replace(temporary, self._path(ticker))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def version(self, ticker: str):
+        """
+        the last cached date and download time of a ticker, or None when it is not cached.
+        """
+
+        cached = self._load(ticker)
+        if cached is None or len(cached[0]) == 0:
+            return None
+
+        return cached[0].index[-1], cached[3]
+
+    def fetch(self, ticker: str, start_date: str, end_date: str) -> pd.core.series.Series:
+        start_date = str(pd.Timestamp(start_date).date())
+        end_date = str(pd.Timestamp(end_date).date())
+        cached = self._load(ticker)
+        now = time.time()
+
+        if cached is None:
+            x = self.provider.fetch(ticker, start_date, end_date)
+            start, end, fetched_at = start_date, end_date, now
+        else:
+            x, start, end, fetched_at = cached
+            pieces = [x]
+
+            if start_date < start:
+                pieces.insert(0, self.provider.fetch(ticker, start_date, start))
+                start = start_date
+
+            # the tail starts again at the last cached bar, which may be an incomplete current day:
+            # it is complete only if it was downloaded on a later day
+            includes_today = end > str(datetime.date.today())
+            incomplete = len(x) > 0 and datetime.date.fromtimestamp(fetched_at) <= x.index[-1].date()
+            if end_date > end or ((includes_today or incomplete) and now - fetched_at > self.ttl):
+                tail_start = str(x.index[-1].date()) if len(x) else start
+                pieces.append(self.provider.fetch(ticker, tail_start, max(end, end_date)))
+                end, fetched_at = max(end, end_date), now
+
+            if len(pieces) > 1:
+                x = pd.concat(pieces)
+                x = x[~x.index.duplicated(keep="last")].sort_index()
+
+        if len(x) and (cached is None or len(pieces) > 1):
+            self._save(ticker, x, start, end, fetched_at)
+
+        x = x.loc[(x.index >= start_date) & (x.index < end_date)]
+        x.index.name = "Date"
+
+        return x.rename("Adj Close")
+
+    def fetch_intraday(self, ticker: str, start_date: str, end_date: str, interval: str) -> pd.core.series.Series:
+        # intraday bars are stored by dal.write_intraday, not in this cache
+        return self.provider.fetch_intraday(ticker, start_date, end_date, interval)
+
+
+
+_default_cache = None
+
+def default_cache() -> PriceCache:
+    """
+    function to get the price cache used by get_close_price when no provider is given.
+    """
+
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PriceCache()
+
+    return _default_cache
+
+
+
+def get_close_price(ticker: str, start_date: str, end_date: str = None, provider=None) -> pd.core.series.Series:
     """
     function to get the adjusted close price from yfinance package.
-    
+
+    parameters:
+        ticker: a string with the name of the ticker.
+        start_date: a string with the first date of the period.
+        end_date: a string with the last date of the period; default option actual day.
+        provider: where the prices come from; default option the local cache in front of yfinance.
+    """
+
+    try:
+        end_date = end_date if end_date is not None else str(datetime.date.today())
+        provider = provider if provider is not None else default_cache()
+        x = provider.fetch(ticker, start_date, end_date)
+    except (TypeError, AttributeError, ValueError):
+        warnings.warn("For brazilian stocks you should put '.SA' after ticker name. Example, 'PETR4' should be 'PETR4.SA' ")
+        return -1
+
+    return x
+
+
+
+def _fetch_with_retry(provider, ticker: str, start_date: str, end_date: str, retries: int, backoff: float,
+                      interval: str = None):
+    """
+    function to fetch one ticker, trying again with exponential backoff on errors or empty answers.
+
+    parameters:
+        provider: where the prices come from.
+        ticker: a string with the name of the ticker.
+        start_date: a string with the first date of the period.
+        end_date: a string with the last date of the period.
+        retries: the number of attempts after the first one.
+        backoff: the seconds to wait before the first retry; doubled at each retry.
+        interval: the bar size of intraday prices; None fetches daily adjusted closes.
+    """
+
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            instrument.count("download.retries")
+            time.sleep(backoff * 2**(attempt - 1))
+        try:
+            if interval is None:
+                x = provider.fetch(ticker, start_date, end_date)
+            else:
+                x = provider.fetch_intraday(ticker, start_date, end_date, interval)
+            if len(x):
+                return x, None
+            error = "no data"
+        except Exception as exception:
+            error = f"{type(exception).__name__}: {exception}"
+
+    instrument.count("download.failures")
+    return None, error
+
+
+
+@instrument.timed("get_close_prices")
+def get_close_prices(tickers: list, start_date: str, end_date: str = None, provider=None, max_workers: int = 8,
+                     retries: int = 2, backoff: float = 0.5):
+    """
+    function to get the adjusted close price of many tickers concurrently.
+
+    parameters:
+        tickers: a list with the names of the tickers.
+        start_date: a string with the first date of the period.
+        end_date: a string with the last date of the period; default option actual day.
+        provider: where the prices come from; default option the local cache in front of yfinance.
+            Every thread uses the same provider, so a YahooProvider(session) shares its session.
+        max_workers: the maximum number of downloads at the same time.
+        retries: the number of attempts after the first one for each ticker.
+        backoff: the seconds to wait before the first retry; doubled at each retry.
+
+    Returns (prices, failures): a pandas DataFrame (dates x tickers) aligned on the union of the
+    dates, and a dict with the error of each ticker that could not be downloaded.
+    """
+
+    end_date = end_date if end_date is not None else str(datetime.date.today())
+    provider = provider if provider is not None else default_cache()
+    tickers = list(dict.fromkeys(tickers))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+        results = list(pool.map(lambda ticker: _fetch_with_retry(provider, ticker, start_date, end_date, retries, backoff), tickers))
+
+    prices = {ticker: x for ticker, (x, _) in zip(tickers, results) if x is not None}
+    failures = {ticker: error for ticker, (_, error) in zip(tickers, results) if error is not None}
+    prices = pd.concat(prices, axis=1).rename_axis("Date") if prices else pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+
+    return prices, failures
+
+
+
+def get_intraday_price(ticker: str, start_date: str, end_date: str = None, interval: str = "1m",
+                       provider=None) -> pd.core.series.Series:
+    """
+    function to get the intraday close price of a ticker.
+
     parameters:
         ticker: a string with the name of the ticker.
         start_date: a string with the first date of the period.
         end_date: a string with the last date of the period; default option actual day.
+        interval: the bar size, from "1m" up: "5m", "15m", "1h", ...
+        provider: where the prices come from; default option yfinance, through the default cache.
+
+    Returns a pandas Series of closes indexed by the UTC time each bar starts. Use
+    dal.write_intraday to keep the bars and dal.read_intraday to read them back as a panel.
     """
 
     try:
-        x = yf.download(ticker, start=start_date, end=end_date)
-        x = x.loc[:,"Adj Close"]
+        interval_seconds(interval)
+        end_date = end_date if end_date is not None else str(datetime.date.today() + datetime.timedelta(days=1))
+        provider = provider if provider is not None else default_cache()
+        x = provider.fetch_intraday(ticker, start_date, end_date, interval)
     except (TypeError, AttributeError, ValueError):
         warnings.warn("For brazilian stocks you should put '.SA' after ticker name. Example, 'PETR4' should be 'PETR4.SA' ")
         return -1
@@ -32,7 +381,38 @@ def get_close_price(ticker: str, start_date: str, end_date: str = default_end_da
 
 
 
-def get_intraday_price():
-    pass
+@instrument.timed("get_intraday_prices")
+def get_intraday_prices(tickers: list, start_date: str, end_date: str = None, interval: str = "1m", provider=None,
+                        max_workers: int = 8, retries: int = 2, backoff: float = 0.5):
+    """
+    function to get the intraday close price of many tickers concurrently.
+
+    parameters:
+        tickers: a list with the names of the tickers.
+        start_date: a string with the first date of the period.
+        end_date: a string with the last date of the period; default option actual day.
+        interval: the bar size, from "1m" up: "5m", "15m", "1h", ...
+        provider: where the prices come from; default option yfinance, through the default cache.
+        max_workers: the maximum number of downloads at the same time.
+        retries: the number of attempts after the first one for each ticker.
+        backoff: the seconds to wait before the first retry; doubled at each retry.
+
+    Returns (prices, failures) as get_close_prices, with float32 prices indexed by the UTC time of the bars.
+    """
+
+    interval_seconds(interval)
+    end_date = end_date if end_date is not None else str(datetime.date.today() + datetime.timedelta(days=1))
+    provider = provider if provider is not None else default_cache()
+    tickers = list(dict.fromkeys(tickers))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+        results = list(pool.map(lambda ticker: _fetch_with_retry(provider, ticker, start_date, end_date, retries, backoff,
+                                                                 interval), tickers))
+
+    prices = {ticker: x.astype(np.float32) for ticker, (x, _) in zip(tickers, results) if x is not None}
+    failures = {ticker: error for ticker, (_, error) in zip(tickers, results) if error is not None}
+    prices = pd.concat(prices, axis=1).rename_axis("Datetime") if prices else \
+             pd.DataFrame(index=pd.DatetimeIndex([], name="Datetime"))
 
+    return prices, failures
 
@@ -0,0 +1,318 @@
+### Instrument module, to time the stages of the pipeline and expose their metrics
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+
+# structured logs: one JSON object per stage, at INFO level
+logger = logging.getLogger("pairs.instrument")
+
+
+class _Settings:
+    """
+    what is measured; everything is off until enable is called or PAIRS_INSTRUMENT is set.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.profile = False
+        self.memory = False
+        self.log = True
+        self.started_tracing = False
+
+
+_settings = _Settings()
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+_profiles = {}
+_local = threading.local()
+
+# the context returned by timer when instrumentation is off, shared so it costs no allocation
+_NULL_TIMER = nullcontext()
+
+
+
+def enable(profile: bool = False, memory: bool = False, log: bool = True) -> None:
+    """
+    function to turn the instrumentation on.
+
+    parameters:
+        profile: if True, each outermost stage of a thread runs under cProfile, see profile_report.
+        memory: if True, the peak memory allocated by each stage is traced with tracemalloc.
+        log: if True, each stage is logged as a JSON object by the pairs.instrument logger.
+
+    cProfile and tracemalloc slow the stages down several times; leave them off unless looking for
+    where the time or the memory goes.
+    """
+
+    _settings.profile = profile
+    _settings.memory = memory
+    _settings.log = log
+    _settings.enabled = True
+
+    if memory:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _settings.started_tracing = True
+
+
+
+def disable() -> None:
+    """
+    function to turn the instrumentation off; the metrics recorded so far are kept.
+    """
+
+    _settings.enabled = False
+    _settings.memory = False
+    if _settings.started_tracing:
+        import tracemalloc
+        tracemalloc.stop()
+        _settings.started_tracing = False
+
+
+
+def is_enabled() -> bool:
+    return _settings.enabled
+
+
+
+def reset() -> None:
+    """
+    function to forget every metric and profile recorded.
+    """
+
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _profiles.clear()
+
+
+
+class _Timer:
+    """
+    context manager that measures one run of a stage and records it when the stage ends.
+    """
+
+    def __init__(self, name: str, fields: dict):
+        self.name = name
+        self.fields = fields
+        self.profiler = None
+        self.peak = 0
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+
+        if _settings.memory:
+            import tracemalloc
+            # the peak so far belongs to the enclosing stage, the peak from here on to this one
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = current
+
+        if _settings.profile and self.parent is None:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # another profiler is running, in another thread or around the whole program
+                self.profiler = None
+
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self.start
+
+        if self.profiler is not None:
+            self.profiler.disable()
+
+        peak_bytes = None
+        if _settings.memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+                peak_bytes = self.peak - self.start_memory
+                if self.parent is not None:
+                    self.parent.peak = max(self.parent.peak, self.peak)
+
+        _local.stack.pop()
+        _record(self.name, seconds, peak_bytes, exc_type is not None, self.profiler)
+
+        if _settings.log:
+            event = {"event": "stage", "stage": self.name, "seconds": round(seconds, 6)}
+            if peak_bytes is not None:
+                event["peak_bytes"] = peak_bytes
+            if exc_type is not None:
+                event["error"] = exc_type.__name__
+            event.update(self.fields)
+            logger.info(json.dumps(event, default=str))
+
+        return False
+
+
+
+def _record(name: str, seconds: float, peak_bytes: int, failed: bool, profiler) -> None:
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = {"calls": 0, "errors": 0, "seconds_total": 0.0, "seconds_max": 0.0,
+                                     "seconds_last": 0.0, "peak_bytes_max": None}
+        stage["calls"] += 1
+        stage["errors"] += failed
+        stage["seconds_total"] += seconds
+        stage["seconds_max"] = max(stage["seconds_max"], seconds)
+        stage["seconds_last"] = seconds
+        if peak_bytes is not None:
+            stage["peak_bytes_max"] = max(stage["peak_bytes_max"] or 0, peak_bytes)
+        if profiler is not None:
+            _profiles[name] = profiler
+
+
+
+def timer(name: str, **fields):
+    """
+    function to measure a stage of the pipeline, as a context manager: with timer("download"): ...
+
+    parameters:
+        name: the name of the stage; stages inside others are usually named "outer.inner".
+        fields: optional values added to the log of the stage, such as the tickers.
+
+    When the instrumentation is off, a shared do-nothing context is returned.
+    """
+
+    if not _settings.enabled:
+        return _NULL_TIMER
+
+    return _Timer(name, fields)
+
+
+
+def timed(name: str = None):
+    """
+    decorator to measure every call of a function as a stage, named after the function by default.
+    """
+
+    def decorator(function):
+        stage = name if name is not None else function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _settings.enabled:
+                return function(*args, **kwargs)
+            with _Timer(stage, {}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+
+def count(name: str, value: int = 1) -> None:
+    """
+    function to add value to a counter, such as cache hits or download retries.
+    """
+
+    if not _settings.enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+
+def metrics() -> dict:
+    """
+    function to get a copy of the metrics: {"stages": {name: {...}}, "counters": {name: value}}.
+
+    Metrics are kept per process, so the workers of parallel.run_pairs do not report to the server.
+    """
+
+    with _lock:
+        return {"enabled": _settings.enabled,
+                "stages": {name: dict(stage) for name, stage in _stages.items()},
+                "counters": dict(_counters)}
+
+
+
+def prometheus_text(gauges: dict = None) -> str:
+    """
+    function to write the metrics in the Prometheus text format, for a /metrics endpoint.
+
+    parameters:
+        gauges: optional extra values, such as {"pipe_cache_entries": 3}.
+    """
+
+    snapshot = metrics()
+    lines = []
+    columns = [("calls", "pairs_stage_calls_total", "counter"), ("errors", "pairs_stage_errors_total", "counter"),
+               ("seconds_total", "pairs_stage_seconds_total", "counter"), ("seconds_max", "pairs_stage_seconds_max", "gauge"),
+               ("seconds_last", "pairs_stage_seconds_last", "gauge"), ("peak_bytes_max", "pairs_stage_peak_bytes_max", "gauge")]
+    for column, metric, kind in columns:
+        values = [(name, stage[column]) for name, stage in snapshot["stages"].items() if stage[column] is not None]
+        if values:
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(f'{metric}{{stage="{name}"}} {value}' for name, value in values)
+
+    if snapshot["counters"]:
+        lines.append("# TYPE pairs_events_total counter")
+        lines.extend(f'pairs_events_total{{name="{name}"}} {value}' for name, value in snapshot["counters"].items())
+
+    for name, value in (gauges or {}).items():
+        lines.append(f"# TYPE pairs_{name} gauge")
+        lines.append(f"pairs_{name} {value}")
+
+    lines.append("# TYPE pairs_instrument_enabled gauge")
+    lines.append(f"pairs_instrument_enabled {int(snapshot['enabled'])}")
+
+    return "\n".join(lines) + "\n"
+
+
+
+def profile_report(name: str, limit: int = 20, sort: str = "cumulative") -> str:
+    """
+    function to get the cProfile report of the last profiled run of a stage, or an empty string.
+
+    parameters:
+        name: the name of the stage.
+        limit: the number of functions listed.
+        sort: the pstats sort key, such as "cumulative" or "tottime".
+    """
+
+    import io
+    import pstats
+
+    with _lock:
+        profiler = _profiles.get(name)
+    if profiler is None:
+        return ""
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+
+    return output.getvalue()
+
+
+
+# PAIRS_INSTRUMENT=1 turns the instrumentation on at import; "profile" and "memory" add the captures,
+# as in PAIRS_INSTRUMENT=profile,memory
+_environment = os.environ.get("PAIRS_INSTRUMENT", "")
+if _environment and _environment != "0":
+    _options = {option.strip() for option in _environment.lower().split(",")}
+    enable(profile="profile" in _options, memory="memory" in _options)
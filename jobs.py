@@ -0,0 +1,148 @@
+### Jobs module, to run the pipeline in the background of the Dash server
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+
+class JobCancelled(Exception):
+    """
+    raised inside a job when every session waiting for it has cancelled it.
+    """
+
+
+
+class Job:
+    """
+    a function running in a JobQueue, with its progress and the number of sessions waiting for it.
+    """
+
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.future = None
+        self.progress = (0, 1, "Queued")
+        self.subscribers = 1
+        self.finished_at = None
+        self._cancelled = threading.Event()
+
+    def report(self, done: int, total: int, label: str) -> None:
+        """
+        called by the job between its stages; stops the job when it was cancelled.
+        """
+
+        if self._cancelled.is_set():
+            raise JobCancelled(self.key)
+        self.progress = (done, total, label)
+
+    @property
+    def status(self) -> str:
+        if self._cancelled.is_set():
+            return "cancelled"
+        if not self.future.done():
+            return "running"
+
+        return "error" if self.future.exception() is not None else "done"
+
+
+
+class JobQueue:
+    """
+    queue of jobs run by a pool of threads, where identical jobs in flight are run only once.
+
+    parameters:
+        max_workers: the number of jobs run at the same time.
+        ttl: seconds a finished job is kept for the sessions that have not read it yet, such as a
+            closed tab; it is then forgotten.
+    """
+
+    def __init__(self, max_workers: int = 2, ttl: float = 600):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self.ttl = ttl
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, function, *args, **kwargs) -> str:
+        """
+        run function(*args, progress=job.report, **kwargs), or join the job with the same key
+        still in flight. Returns the id of the job.
+        """
+
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is not None and job.status == "running":
+                job.subscribers += 1
+                return job.id
+
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            job.future = self._pool.submit(self._run, job, function, args, kwargs)
+
+        return job.id
+
+    def _run(self, job: Job, function, args, kwargs):
+        try:
+            return function(*args, progress=job.report, **kwargs)
+        except JobCancelled:
+            raise
+        except Exception:
+            logger.exception("Job %s for %s failed", job.id, job.key)
+            raise
+        finally:
+            with self._lock:
+                job.finished_at = time.monotonic()
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+
+    def _prune(self) -> None:
+        # finished jobs nobody read within ttl seconds; called with the lock held
+        expired = time.monotonic() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < expired]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def release(self, job_id: str) -> None:
+        """
+        called by a session that no longer waits for a job; the job is forgotten when nobody waits for it.
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.subscribers -= 1
+            if job.subscribers <= 0:
+                del self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> None:
+        """
+        called by a session that no longer wants a job; it stops at its next stage when nobody else waits for it.
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.subscribers <= 1 and job.status == "running":
+                job._cancelled.set()
+                job.future.cancel()
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+        self.release(job_id)
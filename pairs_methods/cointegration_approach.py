@@ -1,7 +1,217 @@
+### Cointegration approach module
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import itertools
+import math
 import numpy as np
 import pandas as pd
 import warnings
 
 
-def cointegration():
-    pass
\ No newline at end of file
+# MacKinnon (1994) response surface of the Engle-Granger tau statistic p-value, and MacKinnon (2010)
+# critical values, for the regression with constant and two variables (the same used by statsmodels.coint).
+_TAU_MAX = 0.92
+_TAU_MIN = -18.86
+_TAU_STAR = -2.62
+_TAU_SMALLP = (2.92, 1.5012, 0.039796)
+_TAU_LARGEP = (2.1945, 0.64695, -0.29198, -0.042377)
+_TAU_CRITICAL = {"1%": (-3.89644, -10.9519, -33.527),
+                 "5%": (-3.33613, -6.1101, -6.823),
+                 "10%": (-3.04445, -4.2412, -2.720)}
+
+
+
+def _mackinnon_table(n_points: int = 4001):
+    """
+    function to precompute the p-value of a grid of tau statistics.
+
+    parameters:
+        n_points: the number of points on each side of _TAU_STAR.
+    """
+
+    def pvalue(tau, coef):
+        return 0.5 * math.erfc(-sum(c * tau**i for i, c in enumerate(coef)) / math.sqrt(2))
+
+    small = np.linspace(_TAU_MIN, _TAU_STAR, n_points)
+    large = np.linspace(_TAU_STAR, _TAU_MAX, n_points)[1:]
+    tau = np.concatenate([small, large])
+    pvalues = np.array([pvalue(t, _TAU_SMALLP) for t in small] + [pvalue(t, _TAU_LARGEP) for t in large])
+
+    return tau, pvalues
+
+
+_TAU_GRID, _PVALUE_GRID = _mackinnon_table()
+
+
+
+def mackinnon_pvalue(tau):
+    """
+    function to get the approximate p-value of Engle-Granger tau statistics from the precomputed table.
+
+    parameters:
+        tau: a float or numpy array with the ADF statistics of the residuals.
+    """
+
+    return np.interp(tau, _TAU_GRID, _PVALUE_GRID, left=0.0, right=1.0)
+
+
+
+def critical_values(nobs: int) -> dict:
+    """
+    function to get the 1%, 5% and 10% critical values of the Engle-Granger test.
+
+    parameters:
+        nobs: the number of observations of the series.
+    """
+
+    return {level: b0 + b1 / (nobs - 1) + b2 / (nobs - 1)**2 for level, (b0, b1, b2) in _TAU_CRITICAL.items()}
+
+
+
+def cointegration(x: pd.core.series.Series, y: pd.core.series.Series, lags: int = 1) -> pd.core.series.Series:
+    """
+    function to run the Engle-Granger cointegration test of one pair.
+
+    parameters:
+        x: a pandas Series with the price of the independent stock.
+        y: a pandas Series with the price of the dependent stock.
+        lags: the number of lagged differences in the ADF regression of the residuals.
+
+    Returns a pandas Series with hedge_ratio, intercept, adf_stat, p_value and half_life.
+    """
+
+    try:
+        data = pd.concat([x, y], axis=1).dropna()
+        x_values = data.iloc[:, 0].to_numpy(dtype=np.float64)
+        y_values = data.iloc[:, 1].to_numpy(dtype=np.float64)
+
+        # hedge ratio: y = intercept + hedge_ratio * x
+        (intercept, hedge_ratio), *_ = np.linalg.lstsq(np.column_stack([np.ones_like(x_values), x_values]), y_values, rcond=None)
+        residual = y_values - intercept - hedge_ratio * x_values
+
+        # ADF regression without constant: de_t = gamma * e_(t-1) + sum(phi_k * de_(t-k))
+        diff = np.diff(residual)
+        design = np.column_stack([residual[lags:-1]] + [diff[lags - k:len(diff) - k] for k in range(1, lags + 1)])
+        beta, *_ = np.linalg.lstsq(design, diff[lags:], rcond=None)
+        sigma2 = np.sum((diff[lags:] - design @ beta)**2) / (len(design) - design.shape[1])
+        adf_stat = beta[0] / np.sqrt(sigma2 * np.linalg.inv(design.T @ design)[0, 0])
+
+        # half-life of mean reversion: de_t = c + lambda * e_(t-1)
+        (_, speed), *_ = np.linalg.lstsq(np.column_stack([np.ones(len(diff)), residual[:-1]]), diff, rcond=None)
+        half_life = -np.log(2) / speed if speed < 0 else np.nan
+    except (TypeError, AttributeError, ValueError, np.linalg.LinAlgError):
+        warnings.warn("Input must be two pandas.core.series.Series dtype float64 longer than lags + 2.")
+        return -1
+
+    return pd.Series({"hedge_ratio": hedge_ratio, "intercept": intercept, "adf_stat": adf_stat,
+                      "p_value": float(mackinnon_pvalue(adf_stat)), "half_life": half_life})
+
+
+
+def _cointegration_batch(x: np.ndarray, y: np.ndarray, lags: int) -> dict:
+    """
+    function to run the Engle-Granger test of many pairs as stacked linear algebra.
+
+    parameters:
+        x: a numpy array (time x pairs) with the prices of the independent stocks.
+        y: a numpy array (time x pairs) with the prices of the dependent stocks.
+        lags: the number of lagged differences in the ADF regression of the residuals.
+    """
+
+    # a flat price (a suspended stock) has no hedge ratio, and a residual identically zero no ADF
+    # regression: those pairs get NaN statistics instead of failing the whole batch
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # hedge ratios of every pair from the closed form of the least squares
+        x_centered = x - x.mean(axis=0)
+        y_centered = y - y.mean(axis=0)
+        hedge_ratio = np.einsum("tp,tp->p", x_centered, y_centered) / np.einsum("tp,tp->p", x_centered, x_centered)
+        intercept = y.mean(axis=0) - hedge_ratio * x.mean(axis=0)
+        residual = y - intercept - hedge_ratio * x
+
+        # ADF regressions of all pairs: design is (pairs x observations x regressors)
+        diff = np.diff(residual, axis=0)
+        n_diff = len(diff)
+        design = np.stack([residual[lags:-1]] + [diff[lags - k:n_diff - k] for k in range(1, lags + 1)], axis=-1)
+        design = design.transpose(1, 0, 2)
+        target = diff[lags:].T
+
+        gram = np.einsum("pnk,pnl->pkl", design, design)
+        finite = np.isfinite(gram).all(axis=(1, 2))
+        degenerate = ~finite
+        degenerate[finite] = np.linalg.matrix_rank(gram[finite], hermitian=True) < gram.shape[-1]
+        gram[degenerate] = np.eye(gram.shape[-1])
+        inverse = np.linalg.inv(gram)
+        beta = np.einsum("pkl,pl->pk", inverse, np.einsum("pnk,pn->pk", design, target))
+        sigma2 = np.sum((target - np.einsum("pnk,pk->pn", design, beta))**2, axis=1) / (design.shape[1] - design.shape[2])
+        adf_stat = np.where(degenerate, np.nan, beta[:, 0] / np.sqrt(sigma2 * inverse[:, 0, 0]))
+
+        # half-life of mean reversion
+        lagged = residual[:-1] - residual[:-1].mean(axis=0)
+        speed = np.einsum("tp,tp->p", lagged, diff - diff.mean(axis=0)) / np.einsum("tp,tp->p", lagged, lagged)
+        half_life = np.where(speed < 0, -np.log(2) / speed, np.nan)
+
+    return {"hedge_ratio": hedge_ratio, "intercept": intercept, "adf_stat": adf_stat,
+            "p_value": mackinnon_pvalue(adf_stat), "half_life": half_life}
+
+
+
+def screen_cointegration(prices: pd.DataFrame, pairs=None, lags: int = 1, chunk_size: int = 2000) -> pd.DataFrame:
+    """
+    function to run the Engle-Granger test on many candidate pairs and rank them.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns (as returned by pairs_selection),
+            a list of (ticker1, ticker2) tuples, or None for every combination of tickers.
+        lags: the number of lagged differences in the ADF regression of the residuals.
+        chunk_size: how many pairs are stacked in each batch of regressions.
+
+    ticker1 is the independent (x) stock and ticker2 the dependent (y) one. Returns a pandas
+    DataFrame with the same columns as cointegration plus the tickers, from the most negative
+    ADF statistic to the least. Each pair is tested on the dates where both of its prices exist,
+    so a late-listed ticker only shortens its own pairs. Pairs with a flat price, such as a
+    suspended stock, or with fewer than lags + 3 common dates get NaN statistics and are ranked last.
+    """
+
+    try:
+        if pairs is None:
+            pairs = list(itertools.combinations(prices.columns, 2))
+        elif isinstance(pairs, pd.DataFrame):
+            pairs = list(zip(pairs["ticker1"], pairs["ticker2"]))
+
+        values = prices.to_numpy(dtype=np.float64)
+        position = {ticker: i for i, ticker in enumerate(prices.columns)}
+        index1 = np.array([position[ticker1] for ticker1, _ in pairs], dtype=np.intp)
+        index2 = np.array([position[ticker2] for _, ticker2 in pairs], dtype=np.intp)
+
+        # each pair is tested on the dates where both prices exist, as in cointegration; pairs of tickers
+        # with the same missing dates share those dates and are stacked together, which is every pair
+        # when no price is missing
+        patterns, ticker_pattern = np.unique(~np.isnan(values), axis=1, return_inverse=True)
+        ticker_pattern = ticker_pattern.reshape(-1)
+        groups, pair_group = np.unique(ticker_pattern[index1] * patterns.shape[1] + ticker_pattern[index2], return_inverse=True)
+
+        columns = ["hedge_ratio", "intercept", "adf_stat", "p_value", "half_life"]
+        results = {column: np.full(len(pairs), np.nan) for column in columns}
+        for group, key in enumerate(groups):
+            rows = np.flatnonzero(patterns[:, key // patterns.shape[1]] & patterns[:, key % patterns.shape[1]])
+            members = np.flatnonzero(pair_group == group)
+            if len(rows) < lags + 3:
+                continue
+            group_values = values if len(rows) == len(values) else values[rows]
+            for start in range(0, len(members), chunk_size):
+                chunk = members[start:start + chunk_size]
+                batch = _cointegration_batch(group_values[:, index1[chunk]], group_values[:, index2[chunk]], lags)
+                for column in columns:
+                    results[column][chunk] = batch[column]
+
+        table = pd.DataFrame(results, columns=columns)
+        table.insert(0, "ticker1", [ticker1 for ticker1, _ in pairs])
+        table.insert(1, "ticker2", [ticker2 for _, ticker2 in pairs])
+        table = table.sort_values("adf_stat", kind="stable").reset_index(drop=True)
+    except (TypeError, AttributeError, ValueError, KeyError, np.linalg.LinAlgError):
+        warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64 and pairs of its columns.")
+        return -1
+
+    return table
@@ -14,16 +14,19 @@ def normalize_series(x_train: pd.core.series.Series, x_test: pd.core.series.Seri
     parameters:
         x_train: a pandas Series with the price of the stock.
         x_test: a pandas Series with the price of the stock.
+
+    numpy arrays, such as the columns of an intraday panel, are normalized the same way, one column per stock;
+    missing prices (NaN) are skipped as pandas does.
     """
 
     try:
-        max_train = np.max(x_train)
-        min_train = np.min(x_train)
+        max_train = np.nanmax(x_train, axis=0)
+        min_train = np.nanmin(x_train, axis=0)
 
-        normalized_train = x_train.sub(min_train).div(max_train - min_train)
+        normalized_train = np.divide(np.subtract(x_train, min_train), max_train - min_train)
 
         if x_test is not None:
-            normalized_test = x_test.sub(min_train).div(max_train - min_train)
+            normalized_test = np.divide(np.subtract(x_test, min_train), max_train - min_train)
             return normalized_train, normalized_test
         else:
             return normalized_train
@@ -64,13 +67,13 @@ def Z_score(spread_train: pd.core.series.Series, spread_test: pd.core.series.Ser
     """
 
     try:
-        mean_train = np.mean(spread_train)
-        std_train = np.std(spread_test)
+        mean_train = np.nanmean(spread_train, axis=0)
+        std_train = np.nanstd(spread_test, axis=0)
 
-        z_score_train = spread_train.sub(mean_train).div(std_train)
+        z_score_train = np.divide(np.subtract(spread_train, mean_train), std_train)
 
         if spread_test is not None:
-            z_score_test = spread_test.sub(mean_train).div(std_train)
+            z_score_test = np.divide(np.subtract(spread_test, mean_train), std_train)
             return (z_score_train, z_score_test)
         else:
             return z_score_train
@@ -81,6 +84,34 @@ def Z_score(spread_train: pd.core.series.Series, spread_test: pd.core.series.Ser
 
 
 
+def rolling_Z_score(spread: pd.core.series.Series, window: int = None, min_periods: int = 2) -> pd.core.series.Series:
+    """
+    function to get the Z-score of the spread against its rolling or expanding mean and standard deviation.
+
+    parameters:
+        spread: a pandas Series with the spread of the pair.
+        window: the number of bars of the rolling window; None uses every bar up to each date (expanding).
+        min_periods: the number of bars needed before a Z-score is given, NaN before it.
+
+    Each bar uses only itself and the bars before it, so there is no look-ahead; the standard deviation
+    is the population one (ddof=0), as in Z_score.
+    """
+
+    try:
+        if window is None:
+            statistics = spread.expanding(min_periods=min_periods)
+        else:
+            statistics = spread.rolling(window, min_periods=min(min_periods, window))
+        z_score = spread.sub(statistics.mean()).div(statistics.std(ddof=0))
+
+    except (TypeError, AttributeError, ValueError):
+        warnings.warn("Input must be a pandas.core.series.Series dtype float64.")
+        return -1
+
+    return z_score
+
+
+
 def calculate_euclidean_distance(x: pd.core.series.Series, y: pd.core.series.Series) -> float: 
     """
     function to calculate the euclidean distance between two pandas Series.
@@ -0,0 +1,174 @@
+### Pairs selection module
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import numpy as np
+import pandas as pd
+import warnings
+
+from pairs_methods import distance_approach as dist
+
+
+def _smallest(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    function to get the positions of the k smallest values without sorting them all.
+
+    parameters:
+        values: a 1-D numpy array.
+        k: the number of positions to return.
+    """
+
+    if len(values) <= k:
+        return np.arange(len(values))
+
+    return np.argpartition(values, k - 1)[:k]
+
+
+
+def select_distance_pairs(prices: pd.DataFrame, k: int = 20, block_size: int = 256,
+                          min_coverage: float = 0.9) -> pd.DataFrame:
+    """
+    function to select the k pairs with the smallest sum of squared differences (SSD)
+    between normalized prices.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices in the formation period.
+        k: the number of pairs to return.
+        block_size: how many tickers are compared against the universe at a time; memory
+            stays around block_size x tickers floats.
+        min_coverage: the minimum fraction of the dates a ticker must have a price on to be compared.
+
+    Tickers with prices on fewer than min_coverage of the dates, such as a name listed late in the
+    period or delisted before it, are left out; the others are compared on the dates where all of
+    them have a price, so the formation period is cut by at most 1 - min_coverage. Returns a pandas
+    DataFrame with ticker1, ticker2, ssd and distance (the same value as
+    distance_approach.calculate_euclidean_distance), sorted from the closest pair.
+    """
+
+    try:
+        # pairs are compared on the dates where every ticker with enough history has a price
+        prices = prices.loc[:, prices.notna().mean() >= min_coverage].dropna(how="any")
+        if len(prices) == 0:
+            # no date where all of them have a price: nothing to compare
+            prices = prices.iloc[:, :0]
+        tickers = np.asarray(prices.columns)
+        n_tickers = len(tickers)
+        normalized = np.empty((0, 0))
+        if n_tickers:
+            normalized = np.asarray(dist.normalize_series(prices.to_numpy(dtype=np.float64)), dtype=np.float64)
+
+        # ||x - y||^2 = ||x||^2 + ||y||^2 - 2 x.y, with the dot products from one Gram block at a time
+        squared_norm = np.einsum("ij,ij->j", normalized, normalized)
+
+        best_ssd = np.empty(0)
+        best_pairs = np.empty((0, 2), dtype=np.intp)
+        for start in range(0, n_tickers - 1, block_size):
+            stop = min(start + block_size, n_tickers)
+
+            ssd = normalized[:, start:stop].T @ normalized
+            ssd *= -2
+            ssd += squared_norm[start:stop, np.newaxis]
+            ssd += squared_norm[np.newaxis, :]
+            np.maximum(ssd, 0, out=ssd)
+
+            # only pairs (i, j) with i < j, and never constant prices
+            ssd[np.arange(start, stop)[:, np.newaxis] >= np.arange(n_tickers)] = np.inf
+            ssd[np.isnan(ssd)] = np.inf
+
+            ssd = ssd.ravel()
+            candidates = _smallest(ssd, k)
+            best_ssd = np.concatenate([best_ssd, ssd[candidates]])
+            best_pairs = np.concatenate([best_pairs, np.column_stack(np.divmod(candidates, n_tickers))
+                                         + [start, 0]])
+
+            keep = _smallest(best_ssd, k)
+            best_ssd, best_pairs = best_ssd[keep], best_pairs[keep]
+
+        order = np.argsort(best_ssd, kind="stable")
+        order = order[np.isfinite(best_ssd[order])]
+        pairs = pd.DataFrame({"ticker1": tickers[best_pairs[order, 0]],
+                              "ticker2": tickers[best_pairs[order, 1]],
+                              "ssd": best_ssd[order],
+                              "distance": np.sqrt(best_ssd[order])})
+    except (TypeError, AttributeError, ValueError):
+        warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64.")
+        return -1
+
+    return pairs
+
+
+
+def screen_correlation(prices: pd.DataFrame, threshold: float = 0.9, use_returns: bool = False, min_periods: int = 2,
+                       block_size: int = 512, dtype=np.float64) -> pd.DataFrame:
+    """
+    function to screen the pairs whose correlation is above a threshold over the whole universe.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks, NaN where a ticker has no price.
+        threshold: the minimum correlation of a pair to be returned.
+        use_returns: if True correlate log returns instead of prices.
+        min_periods: the minimum number of overlapping observations of a pair.
+        block_size: how many tickers are correlated against the universe at a time.
+        dtype: np.float64, or np.float32 to halve memory and speed up the matrix products.
+
+    Each pair is correlated over the dates both tickers have a value, as pandas.DataFrame.corr,
+    but the whole matrix comes from a few matrix products per block. Returns a pandas DataFrame
+    with ticker1, ticker2, correlation and n_obs, one row per pair above the threshold.
+    """
+
+    try:
+        data = np.log(prices).diff().iloc[1:] if use_returns else prices
+        tickers = np.asarray(data.columns)
+        values = np.asarray(data, dtype=dtype)
+        n_tickers = values.shape[1]
+
+        # centering first keeps the sums small, which matters in float32
+        observed = ~np.isnan(values)
+        with warnings.catch_warnings():
+            # a ticker without any value has no mean, and no pair reaches min_periods with it
+            warnings.simplefilter("ignore", RuntimeWarning)
+            centered = np.where(observed, values - np.nanmean(values, axis=0), 0).astype(dtype)
+        full_overlap = observed.all()
+
+        if full_overlap:
+            # one product of standardized columns gives the correlation matrix
+            scale = np.sqrt(np.einsum("ij,ij->j", centered, centered))
+            standardized = centered / scale
+        else:
+            mask = observed.astype(dtype)
+            squared = centered * centered
+
+        edges = []
+        for start in range(0, n_tickers - 1, block_size):
+            stop = min(start + block_size, n_tickers)
+
+            if full_overlap:
+                correlation = standardized[:, start:stop].T @ standardized
+                n_obs = np.full(correlation.shape, len(values))
+            else:
+                # sums over the overlap of each pair of columns
+                n_obs = mask[:, start:stop].T @ mask
+                sum_x = centered[:, start:stop].T @ mask
+                sum_y = mask[:, start:stop].T @ centered
+                sum_xx = squared[:, start:stop].T @ mask
+                sum_yy = mask[:, start:stop].T @ squared
+                sum_xy = centered[:, start:stop].T @ centered
+
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    correlation = (n_obs * sum_xy - sum_x * sum_y) / np.sqrt((n_obs * sum_xx - sum_x * sum_x) *
+                                                                            (n_obs * sum_yy - sum_y * sum_y))
+                correlation[n_obs < min_periods] = np.nan
+
+            upper = np.arange(start, stop)[:, np.newaxis] < np.arange(n_tickers)
+            rows, cols = np.nonzero(upper & (correlation >= threshold))
+            edges.append(pd.DataFrame({"ticker1": tickers[rows + start],
+                                       "ticker2": tickers[cols],
+                                       "correlation": np.clip(correlation[rows, cols], -1, 1),
+                                       "n_obs": n_obs[rows, cols].astype(np.int64)}))
+
+        edges = pd.concat(edges, ignore_index=True) if edges else pd.DataFrame(columns=["ticker1", "ticker2", "correlation", "n_obs"])
+    except (TypeError, AttributeError, ValueError):
+        warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64.")
+        return -1
+
+    return edges
@@ -0,0 +1,133 @@
+### Parallel module, to screen and backtest many pairs in a process pool
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import os
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import backtest
+import instrument
+import walk_forward
+from pairs_methods import cointegration_approach as coint
+
+
+# functions that can run on a chunk of pairs: f(prices, pairs, **kwargs) -> pandas DataFrame
+TASKS = {
+    "backtest": backtest.backtest_pairs,
+    "cointegration": coint.screen_cointegration,
+    "walk_forward": walk_forward.backtest_walk_forward,
+}
+
+# prices of the worker process, a view over the shared memory block
+_worker_prices = None
+_worker_memory = None
+
+
+
+def _attach_prices(memory_name: str, shape: tuple, dtype: str, index: pd.Index, columns: pd.Index) -> None:
+    """
+    function to open the shared price matrix in a worker process, without copying it.
+
+    parameters:
+        memory_name: the name of the shared memory block.
+        shape: the shape of the price matrix.
+        dtype: the dtype of the price matrix.
+        index: the dates of the price matrix.
+        columns: the tickers of the price matrix.
+    """
+
+    global _worker_prices, _worker_memory
+
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    values = np.ndarray(shape, dtype=dtype, buffer=_worker_memory.buf)
+    _worker_prices = pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+
+def _run_chunk(task, chunk_id: int, pairs: list, kwargs: dict, prices: pd.DataFrame = None):
+    """
+    function to run a task on a chunk of pairs, and time it.
+
+    parameters:
+        task: a key of TASKS or a picklable function f(prices, pairs, **kwargs).
+        chunk_id: the position of the chunk, used to put the results back in order.
+        pairs: a list of (ticker1, ticker2) tuples.
+        kwargs: the keyword arguments of the task.
+        prices: the price matrix; the shared one of the worker when None.
+    """
+
+    start = time.perf_counter()
+    function = TASKS[task] if isinstance(task, str) else task
+    result = function(_worker_prices if prices is None else prices, pairs, **kwargs)
+
+    return chunk_id, os.getpid(), time.perf_counter() - start, result
+
+
+
+@instrument.timed("run_pairs")
+def run_pairs(prices: pd.DataFrame, pairs, task="backtest", n_workers: int = None, chunk_size: int = 500,
+              progress=None, **kwargs):
+    """
+    function to run a pair task over chunks of pairs, in a process pool sharing one price matrix.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns, or a list of (ticker1, ticker2) tuples.
+        task: "backtest" (backtest.backtest_pairs), "cointegration" (screen_cointegration), "walk_forward"
+            (walk_forward.backtest_walk_forward), or a picklable function f(prices, pairs, **kwargs)
+            returning a pandas DataFrame.
+        n_workers: the number of processes; 1 runs the same chunks serially, None uses every core.
+        chunk_size: the number of pairs sent to a worker at a time.
+        progress: an optional function progress(done_chunks, total_chunks) called as chunks finish.
+        kwargs: the keyword arguments of the task.
+
+    The chunks are the same for any number of workers and are put back in order, so the result
+    is identical to the serial run. Returns (results, timing), where timing has one row per chunk
+    with the worker pid, the seconds spent and the number of pairs.
+    """
+
+    try:
+        if isinstance(pairs, pd.DataFrame):
+            pairs = list(zip(pairs["ticker1"], pairs["ticker2"]))
+        chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+        n_workers = n_workers or os.cpu_count()
+        outputs = []
+
+        if n_workers == 1:
+            for chunk_id, chunk in enumerate(chunks):
+                outputs.append(_run_chunk(task, chunk_id, chunk, kwargs, prices))
+                if progress is not None:
+                    progress(len(outputs), len(chunks))
+        else:
+            # the price matrix is copied once into shared memory and read in place by the workers
+            values = np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+            memory = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            try:
+                np.ndarray(values.shape, dtype=values.dtype, buffer=memory.buf)[:] = values
+                with ProcessPoolExecutor(max_workers=n_workers, initializer=_attach_prices,
+                                         initargs=(memory.name, values.shape, values.dtype.str, prices.index, prices.columns)) as pool:
+                    futures = [pool.submit(_run_chunk, task, chunk_id, chunk, kwargs) for chunk_id, chunk in enumerate(chunks)]
+                    for future in as_completed(futures):
+                        outputs.append(future.result())
+                        if progress is not None:
+                            progress(len(outputs), len(chunks))
+            finally:
+                memory.close()
+                memory.unlink()
+
+        outputs.sort(key=lambda output: output[0])
+        results = pd.concat([output[3] for output in outputs], ignore_index=True) if outputs else pd.DataFrame()
+        if "adf_stat" in results:
+            results = results.sort_values("adf_stat", kind="stable").reset_index(drop=True)
+        timing = pd.DataFrame([(chunk_id, pid, seconds, len(chunks[chunk_id])) for chunk_id, pid, seconds, _ in outputs],
+                              columns=["chunk", "pid", "seconds", "pairs"])
+    except (TypeError, AttributeError, ValueError, KeyError):
+        warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64 and pairs of its columns.")
+        return -1
+
+    return results, timing
@@ -0,0 +1,213 @@
+### Portfolio module, to backtest many pairs traded at the same time
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import warnings
+import numpy as np
+import pandas as pd
+
+import backtest
+import instrument
+
+
+
+class _PortfolioState:
+    """
+    what a chunk of bars needs from the bars before it: last signals, trades, positions and spread returns.
+    """
+
+    def __init__(self, n_pairs: int, n_tickers: int, lookback: int):
+        self.signal = np.zeros(n_pairs)
+        self.trade_id = np.zeros(n_pairs, dtype=np.int64)
+        self.admitted_id = np.full(n_pairs, -1, dtype=np.int64)
+        self.position = np.zeros(n_pairs)
+        self.exposure = np.zeros(n_tickers)
+        self.spread_returns = np.empty((0, n_pairs))
+        self.lookback = lookback
+
+
+
+def _admit(signal: np.ndarray, state: _PortfolioState, max_open_pairs: int = None) -> np.ndarray:
+    """
+    function to choose the trades taken when at most max_open_pairs pairs can be open at once.
+
+    parameters:
+        signal: a 2-D numpy array (time x pairs) of signals -1, 0 and 1.
+        state: the state after the bars before, updated in place.
+        max_open_pairs: the cap; None takes every trade.
+
+    A trade starts where the signal of a pair leaves zero or flips, and is taken at its first bar if
+    fewer than max_open_pairs taken trades are still open, in the order of the pairs; a taken trade
+    is kept until it closes. Returns a boolean array (time x pairs) of the pairs open in taken trades.
+    """
+
+    previous = np.concatenate([state.signal[np.newaxis], signal[:-1]])
+    entries = (signal != 0) & (signal != previous)
+    trade_id = state.trade_id + np.cumsum(entries, axis=0)
+    is_open = signal != 0
+    state.signal, state.trade_id = signal[-1].copy(), trade_id[-1].copy()
+
+    if max_open_pairs is None:
+        return is_open
+
+    # between two bars with entries, the taken trades only close, so each segment is filled at once
+    admitted = np.zeros(signal.shape, dtype=bool)
+    entry_bars = np.flatnonzero(entries.any(axis=1))
+    bounds = np.concatenate([[0], entry_bars, [len(signal)]])
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if start < end and entries[start].any():
+            kept = (trade_id[start] == state.admitted_id) & is_open[start] & ~entries[start]
+            candidates = np.flatnonzero(entries[start])[:max(max_open_pairs - int(kept.sum()), 0)]
+            state.admitted_id[candidates] = trade_id[start, candidates]
+        admitted[start:end] = (trade_id[start:end] == state.admitted_id) & is_open[start:end]
+
+    return admitted
+
+
+
+def _ticker_sums(values: np.ndarray, ticker: np.ndarray, n_tickers: int) -> np.ndarray:
+    """
+    function to add the values of the pairs (time x pairs) on one of their tickers, giving (time x tickers).
+    """
+
+    cells = np.arange(len(values))[:, np.newaxis] * n_tickers + ticker
+
+    return np.bincount(cells.ravel(), values.ravel(), minlength=len(values) * n_tickers).reshape(len(values), n_tickers)
+
+
+
+def _portfolio_chunk(signal: np.ndarray, x_return: np.ndarray, y_return: np.ndarray, first: np.ndarray,
+                     second: np.ndarray, state: _PortfolioState, weighting: str, max_open_pairs: int,
+                     max_ticker_exposure: float, leverage: float):
+    """
+    function to run the portfolio over a chunk of bars, from the state left by the bars before it.
+
+    Returns (series, weights): a dict of numpy arrays (time) and the weights (time x pairs).
+    """
+
+    n_bars, n_pairs = signal.shape
+    n_tickers = len(state.exposure)
+    admitted = _admit(signal, state, max_open_pairs)
+    spread_return = y_return - x_return
+
+    # volatility of each pair's spread return over the last lookback bars, known at the close of the bar
+    if weighting == "volatility":
+        history = np.concatenate([state.spread_returns, spread_return])
+        valid = ~np.isnan(history)
+        cumulative = [np.concatenate([np.zeros((1, n_pairs)), np.cumsum(values, axis=0)])
+                      for values in (valid, np.where(valid, history, 0), np.where(valid, history, 0)**2)]
+        ends = np.arange(len(state.spread_returns), len(history)) + 1
+        starts = np.maximum(ends - state.lookback, 0)
+        count, total, squares = [values[ends] - values[starts] for values in cumulative]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            volatility = np.sqrt(np.maximum(squares / count - (total / count)**2, 0))
+            base = np.where((count >= 2) & (volatility > 0), 1 / volatility, 0)
+        state.spread_returns = history[-state.lookback:]
+    elif weighting == "equal":
+        base = np.ones((n_bars, n_pairs))
+    else:
+        raise ValueError(f"weighting must be 'equal' or 'volatility', not {weighting!r}")
+
+    # the capital is shared by the open pairs in proportion to their base weight
+    base = np.where(admitted, base, 0)
+    total_base = base.sum(axis=1, keepdims=True)
+    weights = np.divide(base * leverage, total_base, out=np.zeros_like(base), where=total_base > 0)
+
+    # pairs on a ticker above the cap are scaled down so the gross exposure of every ticker fits in it
+    if max_ticker_exposure is not None:
+        gross = _ticker_sums(weights, first, n_tickers) + _ticker_sums(weights, second, n_tickers)
+        with np.errstate(divide="ignore"):
+            room = np.minimum(1, max_ticker_exposure / gross)
+        weights *= np.minimum(room[:, first], room[:, second])
+
+    # long the spread is long the dependent stock and short the independent one
+    position = weights * signal
+    exposure = _ticker_sums(position, second, n_tickers) - _ticker_sums(position, first, n_tickers)
+
+    # use t-1 to avoid look-ahead bias
+    previous_position = np.concatenate([state.position[np.newaxis], position[:-1]])
+    previous_exposure = np.concatenate([state.exposure[np.newaxis], exposure[:-1]])
+    state.position, state.exposure = position[-1].copy(), exposure[-1].copy()
+
+    series = {"return": np.sum(previous_position * np.nan_to_num(spread_return), axis=1),
+              "turnover": np.sum(np.abs(exposure - previous_exposure), axis=1),
+              "gross_exposure": np.sum(np.abs(exposure), axis=1),
+              "net_exposure": np.sum(exposure, axis=1),
+              "open_pairs": np.count_nonzero(position, axis=1)}
+
+    return series, weights
+
+
+
+@instrument.timed("backtest_portfolio")
+def backtest_portfolio(prices: pd.DataFrame, signals, pairs=None, weighting: str = "equal", lookback: int = 63,
+                       max_open_pairs: int = None, max_ticker_exposure: float = None, leverage: float = 1.0,
+                       chunk_bars: int = None, return_weights: bool = False):
+    """
+    This function backtest a portfolio of pairs traded at the same time from their signals.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks, or a dal.IntradayPanel.
+        signals: a 2-D numpy array (dates x pairs) of signals -1, 0 and 1 on the dates of prices, or a pandas
+            DataFrame on some of those dates, such as the signal of walk_forward.walk_forward_pairs.
+        pairs: a list of (ticker1, ticker2) tuples, one per column of signals; taken from the columns of a
+            signals DataFrame when None.
+        weighting: "equal", or "volatility" for weights inversely proportional to the volatility of each
+            pair's spread return over the last lookback bars.
+        lookback: the number of bars of the volatility.
+        max_open_pairs: the most pairs open at the same time; new trades are skipped while it is reached.
+        max_ticker_exposure: the most gross exposure (fraction of the capital) on one ticker.
+        leverage: the capital shared by the open pairs; a pair of weight w is w long and w short.
+        chunk_bars: an optional number of bars run at a time, for very long histories; memory then grows with
+            chunk_bars x pairs instead of dates x pairs, and the result is the same up to rounding.
+        return_weights: if True, returns (portfolio, weights) with the weight of each pair at each bar.
+
+    The spread return of a pair is the return of the dependent stock minus the independent one, as in
+    calculate_trade_return. Returns a pandas DataFrame with the portfolio return, its compound return,
+    the turnover (sum of the changes of the exposure to each ticker), the gross and net exposure and
+    the number of open pairs at each bar.
+    """
+
+    try:
+        if pairs is None:
+            pairs = list(signals.columns)
+        pairs, values, dates, columns, first, second = backtest._pair_columns(prices, pairs)
+
+        # stock returns on the dates of the signals, each from the date before it in prices
+        if isinstance(signals, pd.DataFrame):
+            rows = dates.get_indexer(signals.index)
+            if (rows < 0).any():
+                raise ValueError("signals have dates that are not in prices")
+            signals = signals.to_numpy(dtype=np.float64)
+        else:
+            signals = np.asarray(signals, dtype=np.float64)
+            rows = np.arange(len(signals))
+        if signals.shape != (len(rows), len(pairs)):
+            raise ValueError(f"signals must be (dates x pairs), got {signals.shape} for {len(pairs)} pairs")
+
+        chunk_bars = chunk_bars or max(len(rows), 1)
+        state = _PortfolioState(len(pairs), len(columns), lookback)
+        series, weights = [], []
+        for start in range(0, len(rows), chunk_bars):
+            chunk = rows[start:start + chunk_bars]
+            log_prices = np.log(values[np.concatenate([chunk[:1] - 1, chunk]).clip(0)][:, columns].astype(np.float64))
+            stock_return = np.nan_to_num(np.diff(log_prices, axis=0))
+            output = _portfolio_chunk(np.nan_to_num(signals[start:start + chunk_bars]), stock_return[:, first],
+                                      stock_return[:, second], first, second, state, weighting, max_open_pairs,
+                                      max_ticker_exposure, leverage)
+            series.append(output[0])
+            if return_weights:
+                weights.append(output[1])
+
+        portfolio = pd.DataFrame({name: np.concatenate([chunk[name] for chunk in series]) for name in series[0]},
+                                 index=dates[rows])
+        portfolio.insert(1, "compound_return", np.cumsum(portfolio["return"].to_numpy()))
+    except (TypeError, AttributeError, ValueError, KeyError, IndexError) as error:
+        warnings.warn(f"Could not backtest the portfolio: {error}")
+        return -1
+
+    if return_weights:
+        return portfolio, pd.DataFrame(np.concatenate(weights), index=portfolio.index,
+                                       columns=pd.MultiIndex.from_tuples(pairs, names=["ticker1", "ticker2"]))
+
+    return portfolio
@@ -0,0 +1,110 @@
+### Result cache module, to keep the results of the main pipe in memory
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+
+
+def estimate_nbytes(value) -> int:
+    """
+    function to estimate the memory used by a result: arrays, pandas objects, plotly figures and containers of them.
+
+    parameters:
+        value: the object to measure.
+    """
+
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(index=True)))
+    if hasattr(value, "data") and hasattr(value, "layout"):
+        # plotly figure: the arrays of its traces
+        return sum(estimate_nbytes(np.asarray(trace[axis])) for trace in value.data for axis in ("x", "y")
+                   if trace[axis] is not None)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(item) for item in value)
+
+    return sys.getsizeof(value)
+
+
+
+class ResultCache:
+    """
+    least recently used cache bounded by the number of entries and by their estimated size in bytes.
+
+    parameters:
+        max_bytes: the total estimated size of the entries kept.
+        max_entries: the number of entries kept.
+
+    Each entry is stored with the version of the data it was computed from; asking for a key with
+    another version is a miss and drops the stale entry.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, max_entries: int = 128):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def peek(self, key):
+        """
+        the value of key whatever its version, or None; never fetches, drops or counts anything.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def put(self, key, value, version=None, nbytes: int = None) -> None:
+        nbytes = estimate_nbytes(value) if nbytes is None else nbytes
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return
+
+            self._entries[key] = (version, value, nbytes)
+            self.nbytes += nbytes
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "nbytes": self.nbytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+    def _remove(self, key) -> None:
+        _, _, nbytes = self._entries.pop(key)
+        self.nbytes -= nbytes
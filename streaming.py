@@ -0,0 +1,199 @@
+### Streaming module, to update the distance approach one bar at a time
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+import backtest
+from pairs_methods import distance_approach as dist
+
+
+class RunningStats:
+    """
+    mean and population standard deviation of a stream, updated in O(1) with Welford's method.
+
+    parameters:
+        window: the number of last bars used; None uses every bar seen (expanding).
+
+    NaN and infinite bars take a slot in the window but are left out of the statistics, and count is
+    the number of finite values in it, as the window and min_periods of pandas rolling and expanding
+    (an infinite bar only spoils the pandas statistics while it is in the window). The value
+    leaving the window is removed by the reverse Welford update, so each update costs the same
+    whatever the window size.
+    """
+
+    def __init__(self, window: int = None):
+        if window is not None and window < 1:
+            raise ValueError("window must be a positive number of bars.")
+        self.window = window
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._values = deque() if window is not None else None
+
+    def update(self, value: float) -> None:
+        """
+        add one bar; a NaN or infinite bar only moves the window.
+        """
+
+        value = float(value)
+        if self._values is not None:
+            self._values.append(value)
+            if len(self._values) > self.window:
+                old = self._values.popleft()
+                if math.isfinite(old):
+                    self._remove(old)
+
+        if math.isfinite(value):
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float) -> None:
+        # reverse Welford update
+        self.count -= 1
+        if self.count == 0:
+            self.mean, self._m2 = 0.0, 0.0
+            return
+        mean = self.mean - (value - self.mean) / self.count
+        self._m2 = max(self._m2 - (value - self.mean) * (value - mean), 0.0)
+        self.mean = mean
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else math.nan
+
+
+
+class PairStream:
+    """
+    state of the distance approach of one pair, updated with each new bar: spread, Z-score and position.
+
+    parameters:
+        min1, max1: the in-sample minimum and maximum price of the independent stock, see normalize_series.
+        min2, max2: the in-sample minimum and maximum price of the dependent stock.
+        open_position: the Z-score where a position is opened.
+        close_position: the Z-score where a position is closed.
+        mean, std: fixed mean and standard deviation of the spread, as in Z_score; when they are not
+            given, the spread is scored against its running statistics, as in rolling_Z_score.
+        window: the number of bars of the running statistics; None is expanding.
+        min_periods: the number of valid bars in the running statistics before a Z-score is given.
+
+    The operations are the ones of the batch functions, so a stream fed the prices of a period gives
+    the same spread, Z-score and signal as normalize_series, spread_distance, Z_score (or
+    rolling_Z_score) and generate_signal over that period.
+    """
+
+    def __init__(self, min1: float, max1: float, min2: float, max2: float, open_position: float = 1,
+                 close_position: float = 0, mean: float = None, std: float = None, window: int = None,
+                 min_periods: int = 2):
+        self.min1, self.range1 = np.float64(min1), np.float64(max1) - np.float64(min1)
+        self.min2, self.range2 = np.float64(min2), np.float64(max2) - np.float64(min2)
+        self.open_position = abs(open_position)
+        self.close_position = abs(close_position)
+        self.fixed = mean is not None and std is not None
+        self.mean, self.std = mean, std
+        self.stats = None if self.fixed else RunningStats(window)
+        self.min_periods = min(min_periods, window) if window is not None else min_periods
+        self.spread = math.nan
+        self.z_score = math.nan
+        self.position = 0
+
+    @classmethod
+    def fit(cls, stock1_train: pd.core.series.Series, stock2_train: pd.core.series.Series, open_position: float = 1,
+            close_position: float = 0, statistics: str = "fixed", window: int = None, std: float = None):
+        """
+        function to start a stream from the in-sample prices of a pair.
+
+        parameters:
+            stock1_train: a pandas Series with the in-sample price of the independent stock.
+            stock2_train: a pandas Series with the in-sample price of the dependent stock.
+            open_position: the Z-score where a position is opened.
+            close_position: the Z-score where a position is closed.
+            statistics: "fixed" scores with the in-sample mean and standard deviation of the spread,
+                "running" with running statistics warmed up on the in-sample spread.
+            window: the number of bars of the running statistics; None is expanding.
+            std: with fixed statistics, the standard deviation used instead of the in-sample one;
+                Z_score divides by the standard deviation of the out-of-sample spread, pass it here to
+                reproduce it.
+
+        The position starts flat, at the start of the out-of-sample.
+        """
+
+        # the in-sample statistics come from the batch functions themselves
+        spread = dist.spread_distance(dist.normalize_series(stock1_train), dist.normalize_series(stock2_train))
+        limits = (np.min(stock1_train), np.max(stock1_train), np.min(stock2_train), np.max(stock2_train))
+
+        if statistics == "fixed":
+            return cls(*limits, open_position, close_position, mean=np.mean(spread),
+                       std=np.std(spread) if std is None else std)
+
+        stream = cls(*limits, open_position, close_position, window=window)
+        for value in spread.to_numpy() if window is None else spread.to_numpy()[-window:]:
+            stream.stats.update(value)
+
+        return stream
+
+    def _score(self, spread: float) -> float:
+        # NaN before min_periods bars and inf or NaN for a zero standard deviation, as the batch functions
+        if not self.fixed:
+            self.stats.update(spread)
+            if self.stats.count < self.min_periods:
+                return math.nan
+            self.mean, self.std = self.stats.mean, self.stats.std
+
+        deviation = spread - self.mean
+        if self.std == 0:
+            return math.nan if deviation == 0 or math.isnan(deviation) else math.copysign(math.inf, deviation)
+
+        return deviation / self.std
+
+    def _spread(self, price1, price2):
+        # numpy division: a flat in-sample price gives inf or NaN, as normalize_series, instead of raising
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (price2 - self.min2) / self.range2 - (price1 - self.min1) / self.range1
+
+    def update(self, price1: float, price2: float) -> tuple:
+        """
+        function to add a new bar of the pair; returns (spread, z_score, position).
+
+        parameters:
+            price1: the price of the independent stock.
+            price2: the price of the dependent stock.
+        """
+
+        self.spread = float(self._spread(np.float64(price1), np.float64(price2)))
+        self.z_score = self._score(self.spread)
+        self.position = backtest._signal_step(self.z_score, self.position, self.open_position, self.close_position)
+
+        return self.spread, self.z_score, self.position
+
+    def update_many(self, prices1, prices2) -> tuple:
+        """
+        function to add a micro-batch of bars of the pair; returns numpy arrays (spread, z_score, position).
+
+        parameters:
+            prices1: an array-like with the prices of the independent stock.
+            prices2: an array-like with the prices of the dependent stock.
+        """
+
+        x = np.asarray(prices1, dtype=np.float64)
+        y = np.asarray(prices2, dtype=np.float64)
+        if len(x) == 0:
+            return np.empty(0), np.empty(0), np.empty(0, dtype=np.int8)
+
+        spread = self._spread(x, y)
+        if self.fixed:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z_score = (spread - self.mean) / self.std
+        else:
+            z_score = np.array([self._score(value) for value in spread])
+        position = backtest._signal_states(z_score, self.open_position, self.close_position, self.position)
+
+        self.spread, self.z_score, self.position = float(spread[-1]), float(z_score[-1]), int(position[-1])
+
+        return spread, z_score, position
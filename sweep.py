@@ -0,0 +1,195 @@
+### Sweep module, to search the parameters of the distance approach
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import itertools
+import sqlite3
+import warnings
+import numpy as np
+import pandas as pd
+
+import backtest
+import instrument
+import parallel
+
+
+# the columns of a parameter grid, one row per point
+GRID_COLUMNS = ["pct_insample", "window", "open_position", "close_position"]
+
+# the number of float64 trade returns computed at once, in bars x pairs x thresholds
+_BLOCK_VALUES = 2**23
+
+
+
+def parameter_grid(open_positions=(1,), close_positions=(0,), pct_insamples=(0.7,), windows=(None,)) -> pd.DataFrame:
+    """
+    function to build every combination of the parameters of the distance approach.
+
+    parameters:
+        open_positions: the Z-scores where a position is opened.
+        close_positions: the Z-scores where a position is closed.
+        pct_insamples: the sizes (percentage) of the in-sample, see split_train_test.
+        windows: the number of last in-sample bars used to normalize the prices and center the spread;
+            None uses the whole in-sample, as main_pipe.
+    """
+
+    points = itertools.product(pct_insamples, windows, open_positions, close_positions)
+
+    return pd.DataFrame(list(points), columns=GRID_COLUMNS)
+
+
+
+def random_grid(n_points: int, open_range: tuple = (0.5, 3), close_range: tuple = (0, 1), pct_insamples=(0.7,),
+                windows=(None,), seed: int = 0) -> pd.DataFrame:
+    """
+    function to draw random points of the parameters of the distance approach.
+
+    parameters:
+        n_points: the number of points.
+        open_range: the (lowest, highest) Z-score where a position is opened.
+        close_range: the (lowest, highest) Z-score where a position is closed.
+        pct_insamples: the sizes (percentage) of the in-sample to choose from.
+        windows: the normalization windows to choose from, see parameter_grid.
+        seed: the seed of the random generator.
+
+    Thresholds are drawn uniformly, while the in-sample sizes and windows are drawn from their lists,
+    so the points share normalized prices and spreads as the points of a grid do.
+    """
+
+    rng = np.random.default_rng(seed)
+    windows = list(windows)
+
+    return pd.DataFrame({"pct_insample": rng.choice(np.asarray(pct_insamples, dtype=np.float64), n_points),
+                         "window": [windows[i] for i in rng.integers(0, len(windows), n_points)],
+                         "open_position": rng.uniform(*open_range, n_points),
+                         "close_position": rng.uniform(*close_range, n_points)})
+
+
+
+def sweep_pairs(prices: pd.DataFrame, pairs, grid: pd.DataFrame, sample: str = "all",
+                periods_per_year: int = 252, costs: backtest.CostModel = None) -> pd.DataFrame:
+    """
+    function to backtest pairs at every point of a parameter grid, as backtest.backtest_pairs does for one point.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns, or a list of (ticker1, ticker2) tuples.
+        grid: a pandas DataFrame with the GRID_COLUMNS, from parameter_grid or random_grid.
+        sample: the bars the performance is measured on: "all", "train" (in-sample) or "test" (out-of-sample).
+        periods_per_year: the number of bars in a year, used to annualize the Sharpe ratio.
+        costs: an optional backtest.CostModel; its costs are subtracted from the returns.
+
+    The prices of each ticker are normalized once per in-sample size and window, and the spreads and
+    Z-scores of the pairs once per in-sample size and window too; every threshold of the grid is then
+    tested on them at once. Returns one row per pair and point, with the point (row of the grid),
+    its parameters and the columns of calculate_performance.
+    """
+
+    try:
+        pairs, values, _, columns, first, second = backtest._pair_columns(prices, pairs)
+        values = values[:, columns].astype(np.float64)
+        returns = np.nan_to_num(np.diff(np.log(values), axis=0, prepend=np.nan))
+        n_bars = len(values)
+
+        results = []
+        grid = grid.reset_index(drop=True)
+        for (pct_insample, window), points in grid.groupby(["pct_insample", "window"], sort=False, dropna=False):
+            window = None if pd.isna(window) else int(window)
+            n = round(n_bars*pct_insample)
+            start = 0 if window is None else max(n - window, 0)
+
+            # same steps as backtest_pairs, over the in-sample window
+            z_score = backtest._distance_z_score(values, first, second, n, start)
+            rows = {"all": slice(0, n_bars), "train": slice(0, n), "test": slice(n, n_bars)}[sample]
+
+            thresholds = np.abs(points[["open_position", "close_position"]].to_numpy(dtype=np.float64))
+            block = max(1, _BLOCK_VALUES // max(n_bars * len(pairs), 1))
+            for k in range(0, len(thresholds), block):
+                signal = backtest._signal_states(z_score[:, :, np.newaxis], thresholds[k:k + block, 0],
+                                                 thresholds[k:k + block, 1])
+                trade_return = backtest._trade_returns(signal, returns[:, first, np.newaxis], returns[:, second, np.newaxis])
+                if costs is not None:
+                    trade_return -= backtest._pair_costs(signal, costs, pairs, (1,))
+                performance = backtest.calculate_performance(trade_return[rows], signal[rows], periods_per_year)
+
+                # one row per pair and point, pairs first
+                block_points = points.iloc[k:k + block]
+                result = pd.DataFrame({"ticker1": np.repeat([ticker1 for ticker1, _ in pairs], len(block_points)),
+                                       "ticker2": np.repeat([ticker2 for _, ticker2 in pairs], len(block_points)),
+                                       "point": np.tile(block_points.index.to_numpy(), len(pairs))})
+                for column in GRID_COLUMNS:
+                    result[column] = np.tile(block_points[column].to_numpy(), len(pairs))
+                for column, statistic in performance.items():
+                    result[column] = statistic.ravel()
+                result["pair"] = np.repeat(np.arange(len(pairs)), len(block_points))
+                results.append(result)
+
+        results = pd.concat(results, ignore_index=True).sort_values(["pair", "point"], kind="stable")
+        results = results.drop(columns="pair").reset_index(drop=True)
+    except (TypeError, AttributeError, ValueError, KeyError):
+        warnings.warn("Input must be a pandas.core.frame.DataFrame dtype float64, pairs of its columns and a parameter grid.")
+        return -1
+
+    return results
+
+
+
+@instrument.timed("run_sweep")
+def run_sweep(prices: pd.DataFrame, pairs, grid: pd.DataFrame, sample: str = "all", periods_per_year: int = 252,
+              n_workers: int = None, chunk_size: int = 50, database: str = None, table: str = "sweep",
+              progress=None, costs: backtest.CostModel = None):
+    """
+    function to run a parameter sweep over many pairs in a process pool and keep the results in a database.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns, or a list of (ticker1, ticker2) tuples.
+        grid: a pandas DataFrame with the GRID_COLUMNS, from parameter_grid or random_grid.
+        sample: the bars the performance is measured on: "all", "train" or "test".
+        periods_per_year: the number of bars in a year, used to annualize the Sharpe ratio.
+        n_workers: the number of processes, see parallel.run_pairs.
+        chunk_size: the number of pairs sent to a worker at a time.
+        database: an optional path of a SQLite file where the results are appended to table.
+        table: the name of the table of results.
+        progress: an optional function progress(done_chunks, total_chunks) called as chunks finish.
+        costs: an optional backtest.CostModel; its costs are subtracted from the returns.
+
+    Returns (results, timing) as parallel.run_pairs; read the database back with query_sweep.
+    """
+
+    output = parallel.run_pairs(prices, pairs, sweep_pairs, n_workers, chunk_size, progress, grid=grid,
+                                sample=sample, periods_per_year=periods_per_year, costs=costs)
+    if isinstance(output, int):
+        return -1
+    results, timing = output
+
+    if database is not None:
+        with sqlite3.connect(database) as connection:
+            results.to_sql(table, connection, if_exists="append", index=False)
+            connection.execute(f'CREATE INDEX IF NOT EXISTS "{table}_pair" ON "{table}" (ticker1, ticker2)')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS "{table}_sharpe" ON "{table}" (sharpe)')
+        connection.close()
+
+    return results, timing
+
+
+
+def query_sweep(database: str, sql: str = "SELECT * FROM sweep ORDER BY sharpe DESC LIMIT 20", params=None) -> pd.DataFrame:
+    """
+    function to query the results of run_sweep.
+
+    parameters:
+        database: the path of the SQLite file.
+        sql: a SQL query; the best 20 points by Sharpe ratio by default.
+        params: optional parameters of the query, for its ? placeholders.
+    """
+
+    try:
+        with sqlite3.connect(database) as connection:
+            results = pd.read_sql_query(sql, connection, params=params)
+        connection.close()
+    except (sqlite3.Error, pd.errors.DatabaseError) as error:
+        warnings.warn(f"Could not query the sweep: {error}")
+        return -1
+
+    return results
@@ -0,0 +1,238 @@
+### Tests of the backtest module against the per-bar loops it replaced
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+
+
+def loop_signal(z_score: np.ndarray, open_position: float, close_position: float) -> np.ndarray:
+    """
+    the per-bar loop of generate_signal before it was vectorized, over a numpy array.
+    """
+
+    signal = np.full(len(z_score), np.nan)
+    if len(z_score) == 0:
+        return signal
+
+    open_position = np.abs(open_position)
+    close_position = np.abs(close_position)
+
+    # initial position
+    if z_score[0] <= -open_position:
+        signal[0] = 1
+    elif z_score[0] >= open_position:
+        signal[0] = -1
+    else:
+        signal[0] = 0
+
+    # loop to verify if Z_score crosses threshold long or short
+    for t in range(1, len(z_score)):
+        if signal[t-1] == 0:                   # when position is close
+            if z_score[t] <= -open_position:
+                signal[t] = 1
+            elif z_score[t] >= open_position:
+                signal[t] = -1
+            else:
+                signal[t] = 0
+        elif signal[t-1] == -1:                # when position is open at threshold long
+            if z_score[t] <= close_position:
+                signal[t] = 0
+            else:
+                signal[t] = signal[t-1]
+        elif signal[t-1] == 1:                 # when position is open at threshold short
+            if z_score[t] >= -close_position:
+                signal[t] = 0
+            else:
+                signal[t] = signal[t-1]
+
+    return signal
+
+
+
+def loop_trade_return(signal: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    the per-bar loop of calculate_trade_return before it was vectorized, over numpy arrays.
+    """
+
+    trade_return = np.full(len(signal), np.nan)
+    if len(signal) == 0:
+        return trade_return
+    trade_return[0] = 0
+
+    for t in range(1, len(signal)):
+        # use t-1 to avoid look-ahead bias
+        if signal[t-1] == -1:
+            trade_return[t] = np.add(-y[t], x[t])
+        if signal[t-1] == 1:
+            trade_return[t] = np.add(y[t], -x[t])
+        if signal[t-1] == 0:
+            trade_return[t] = 0
+
+    return trade_return
+
+
+
+def random_z_score(rng: np.random.Generator, n: int, thresholds: tuple) -> np.ndarray:
+    """
+    a random Z-score with NaN bars and bars exactly on the thresholds and on their negatives.
+    """
+
+    z_score = rng.normal(0, 1.5, n)
+    ties = np.array([value for threshold in thresholds for value in (threshold, -threshold)])
+    on_threshold = rng.random(n) < 0.15
+    z_score[on_threshold] = rng.choice(ties, on_threshold.sum())
+    z_score[rng.random(n) < 0.05] = np.nan
+
+    return z_score
+
+
+
+THRESHOLDS = [(1, 0), (2, 0.5), (0.5, 1.5), (-1, -0.25), (1.5, -2), (0, 0), (1, 1)]
+
+
+@pytest.mark.parametrize("open_position, close_position", THRESHOLDS)
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 250])
+@pytest.mark.parametrize("seed", range(5))
+def test_generate_signal_matches_loop(seed, n, open_position, close_position):
+    rng = np.random.default_rng(seed)
+    z_score = random_z_score(rng, n, (open_position, close_position))
+    z_score = pd.Series(z_score, index=pd.bdate_range("2020-01-01", periods=n), dtype=np.float64)
+
+    signal = backtest.generate_signal(z_score, open_position, close_position)
+
+    assert isinstance(signal, pd.Series)
+    assert signal.index.equals(z_score.index)
+    np.testing.assert_array_equal(signal.to_numpy(), loop_signal(z_score.to_numpy(), open_position, close_position))
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 250])
+@pytest.mark.parametrize("seed", range(3))
+def test_generate_signal_batch_matches_loop(seed, n):
+    rng = np.random.default_rng(seed)
+    z_scores = np.column_stack([random_z_score(rng, n, thresholds) for thresholds in THRESHOLDS[:4]])
+
+    signals = backtest.generate_signal_batch(z_scores, THRESHOLDS)
+
+    assert signals.shape == (n, z_scores.shape[1], len(THRESHOLDS))
+    for pair in range(z_scores.shape[1]):
+        for k, (open_position, close_position) in enumerate(THRESHOLDS):
+            np.testing.assert_array_equal(signals[:, pair, k], loop_signal(z_scores[:, pair], open_position, close_position))
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 250])
+@pytest.mark.parametrize("seed", range(5))
+def test_calculate_trade_return_matches_loop(seed, n):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2020-01-01", periods=n)
+    signal = pd.Series(loop_signal(random_z_score(rng, n, (1, 0)), 1, 0), index=index)
+    x = pd.Series(rng.normal(0, 0.01, n), index=index)
+    y = pd.Series(rng.normal(0, 0.01, n), index=index)
+
+    trade_return = backtest.calculate_trade_return(signal, x, y)
+
+    assert trade_return.index.equals(index)
+    np.testing.assert_allclose(trade_return.to_numpy(), loop_trade_return(signal.to_numpy(), x.to_numpy(), y.to_numpy()),
+                               rtol=0, atol=1e-15)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_calculate_trade_return_batch_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    n, n_pairs = 250, 4
+    signals = np.column_stack([loop_signal(random_z_score(rng, n, (1, 0)), 1, 0) for _ in range(n_pairs)])
+    x, y = rng.normal(0, 0.01, (n, n_pairs)), rng.normal(0, 0.01, (n, n_pairs))
+
+    trade_return = backtest.calculate_trade_return_batch(signals, x, y)
+
+    for pair in range(n_pairs):
+        np.testing.assert_allclose(trade_return[:, pair], loop_trade_return(signals[:, pair], x[:, pair], y[:, pair]),
+                                   rtol=0, atol=1e-15)
+
+
+def test_calculate_drawdown_summary_without_rows():
+    drawdown, summary = backtest.calculate_drawdown(pd.DataFrame(np.empty((0, 2))), summary=True)
+
+    assert drawdown.shape == (0, 2)
+    assert list(summary.index) == [0, 1]
+    assert summary.isna().all().all()
+
+
+
+# open long, hold, flip to short, close, stay flat; the returns are zero, so the trade return is minus the cost
+COST_SIGNAL = np.array([0, 1, 1, -1, 0, 0], dtype=np.float64)
+COST_MODEL = backtest.CostModel(commission_bps=1, slippage_bps=2, fee_per_order=5, capital=10000,
+                                borrow_bps_per_day=10, bars_per_day=2, fee_schedule={"A": 3, "B": 4}, default_fee_bps=1)
+
+
+def hand_costs(fee_bps: float) -> np.ndarray:
+    """
+    the costs of COST_SIGNAL under COST_MODEL with fee_bps the sum of the fees of both tickers, worked by hand.
+    """
+
+    # per unit traded: commission and slippage on both legs plus the fees; per order: the fixed fee on both legs;
+    # per bar held: the borrow of the short leg for half a day
+    unit = (2 * (1 + 2) + fee_bps) / 10000
+    order = 2 * 5 / 10000
+    borrow = 10 / 10000 / 2
+
+    return np.array([0,
+                     unit + order,                      # open: one unit, one order
+                     borrow,                            # hold
+                     2 * unit + 2 * order + borrow,     # flip: two units, a close and an open
+                     unit + order + borrow,             # close
+                     0])
+
+
+
+@pytest.mark.parametrize("tickers, fee_bps", [(None, 2), (("A", "B"), 7), (("B", "C"), 5)])
+def test_calculate_trade_return_costs(tickers, fee_bps):
+    zeros = pd.Series(np.zeros(len(COST_SIGNAL)))
+
+    trade_return = backtest.calculate_trade_return(pd.Series(COST_SIGNAL), zeros, zeros, COST_MODEL, tickers)
+
+    np.testing.assert_allclose(trade_return.to_numpy(), -hand_costs(fee_bps), rtol=1e-12, atol=1e-18)
+
+
+def test_calculate_trade_return_costs_without_borrow_or_fees():
+    costs = backtest.CostModel(commission_bps=10)
+    signal = np.array([np.nan, 1, 1, 0, -1, 1])
+    x = np.full(len(signal), 0.01)
+
+    trade_return = backtest.calculate_trade_return(signal, x, 2 * x, costs)
+
+    # the bar after a NaN signal has no return, as the loop; 20 bps per unit traded on the two legs,
+    # and a flip trades two units
+    np.testing.assert_allclose(trade_return, [0, np.nan, 0.01, 0.01 - 0.002, -0.002, -0.01 - 0.004], rtol=1e-12)
+
+
+def test_calculate_trade_return_batch_costs():
+    pairs = [("A", "B"), ("C", "A"), ("C", "D")]
+    signals = np.stack([COST_SIGNAL, -COST_SIGNAL, np.zeros(len(COST_SIGNAL))], axis=1)
+    zeros = np.zeros(signals.shape)
+
+    trade_return = backtest.calculate_trade_return_batch(signals, zeros, zeros, COST_MODEL, pairs)
+
+    np.testing.assert_allclose(trade_return[:, 0], -hand_costs(7), rtol=1e-12, atol=1e-18)
+    np.testing.assert_allclose(trade_return[:, 1], -hand_costs(4), rtol=1e-12, atol=1e-18)
+    np.testing.assert_array_equal(trade_return[:, 2], np.zeros(len(COST_SIGNAL)))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_calculate_trade_return_batch_costs_over_thresholds(seed):
+    rng = np.random.default_rng(seed)
+    n, pairs = 250, [("A", "B"), ("B", "C"), ("D", "E")]
+    z_scores = np.column_stack([random_z_score(rng, n, thresholds) for thresholds in THRESHOLDS[:3]])
+    x, y = rng.normal(0, 0.01, (n, len(pairs))), rng.normal(0, 0.01, (n, len(pairs)))
+    signals = backtest.generate_signal_batch(z_scores, THRESHOLDS)
+
+    trade_return = backtest.calculate_trade_return_batch(signals, x, y, COST_MODEL, pairs)
+
+    assert trade_return.shape == (n, len(pairs), len(THRESHOLDS))
+    for pair, tickers in enumerate(pairs):
+        for k in range(len(THRESHOLDS)):
+            expected = backtest.calculate_trade_return(signals[:, pair, k], x[:, pair], y[:, pair], COST_MODEL, tickers)
+            np.testing.assert_allclose(trade_return[:, pair, k], expected, rtol=0, atol=1e-15)
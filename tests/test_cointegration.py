@@ -0,0 +1,63 @@
+### Tests of the cointegration_approach module
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+from pairs_methods import cointegration_approach as coint
+
+
+def test_screen_cointegration_flat_ticker():
+    prices = benchmark.synthetic_prices(300, 3)
+    prices["FLAT"] = 5.0
+
+    table = coint.screen_cointegration(prices)
+    expected = coint.screen_cointegration(prices.drop(columns="FLAT"))
+
+    flat = (table["ticker1"] == "FLAT") | (table["ticker2"] == "FLAT")
+    assert flat.sum() == 3
+    assert table.loc[flat, ["adf_stat", "p_value", "half_life"]].isna().all().all()
+    pd.testing.assert_frame_equal(table[~flat].reset_index(drop=True), expected)
+    assert list(table.index[flat]) == [3, 4, 5]
+
+
+def test_screen_cointegration_late_listing_matches_cointegration():
+    prices = benchmark.synthetic_prices(500, 4)
+    prices.iloc[:400, 3] = np.nan
+    prices.iloc[100:110, 2] = np.nan
+
+    table = coint.screen_cointegration(prices, chunk_size=2).set_index(["ticker1", "ticker2"])
+
+    for ticker1, ticker2 in table.index:
+        expected = coint.cointegration(prices[ticker1], prices[ticker2])
+        pd.testing.assert_series_equal(table.loc[(ticker1, ticker2)], expected, check_names=False, rtol=1e-12, atol=1e-12)
+
+
+def test_screen_cointegration_without_common_dates():
+    prices = benchmark.synthetic_prices(100, 2)
+    prices["EMPTY"] = np.nan
+
+    table = coint.screen_cointegration(prices)
+
+    assert len(table) == 3
+    assert table.iloc[1:][["hedge_ratio", "adf_stat", "p_value"]].isna().all().all()
+    assert table.iloc[0][["adf_stat", "p_value"]].notna().all()
+
+
+@pytest.mark.parametrize("lags", [1, 2, 4])
+def test_screen_cointegration_matches_statsmodels(lags):
+    stattools = pytest.importorskip("statsmodels.tsa.stattools")
+    prices = benchmark.synthetic_prices(400, 6)
+
+    table = coint.screen_cointegration(prices, lags=lags, chunk_size=4)
+
+    assert len(table) == 15
+    for row in table.itertuples():
+        # statsmodels regresses its first series (the dependent ticker2) on the second
+        adf_stat, p_value, critical = stattools.coint(prices[row.ticker2], prices[row.ticker1], maxlag=lags, autolag=None)
+        assert row.adf_stat == pytest.approx(adf_stat, rel=1e-10)
+        assert row.p_value == pytest.approx(p_value, abs=1e-6)
+    np.testing.assert_allclose(list(coint.critical_values(len(prices)).values()), critical, rtol=1e-12)
@@ -0,0 +1,35 @@
+### Tests of the dal module
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import threading
+import numpy as np
+import pandas as pd
+
+import dal
+
+
+def test_write_intraday_from_threads(tmp_path):
+    times = pd.date_range("2024-01-02 14:00", periods=30, freq="1min", tz="UTC")
+    errors = []
+
+    def write(i):
+        prices = pd.DataFrame({f"T{i}": np.arange(30, dtype=np.float64) + i}, index=times)
+        for _ in range(5):
+            if dal.write_intraday(prices, root=str(tmp_path)) != 30:
+                errors.append(i)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    panel = dal.read_intraday(root=str(tmp_path))
+
+    assert errors == []
+    assert sorted(panel.tickers) == sorted(f"T{i}" for i in range(12))
+    for i in range(12):
+        np.testing.assert_array_equal(panel.column(f"T{i}"), np.arange(30, dtype=np.float32) + i)
+    assert sorted(path.name for path in (tmp_path / "1m").iterdir()) == ["2024-01-02.times.npy", "2024-01-02.values.npy",
+                                                                         "_tickers.json"]
@@ -0,0 +1,115 @@
+### Tests of the pairs_selection module against the pair by pair functions of pairs_methods
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+import pairs_selection
+from pairs_methods import distance_approach as dist
+
+
+def loop_distance_pairs(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    the distance of every combination of tickers with calculate_euclidean_distance, closest first.
+    """
+
+    normalized = prices.apply(dist.normalize_series)
+    rows = [(ticker1, ticker2, dist.calculate_euclidean_distance(normalized[ticker1], normalized[ticker2]))
+            for ticker1, ticker2 in itertools.combinations(prices.columns, 2)]
+
+    return pd.DataFrame(rows, columns=["ticker1", "ticker2", "distance"]).sort_values("distance", kind="stable")
+
+
+
+@pytest.mark.parametrize("k, block_size", [(5, 256), (10, 3), (1000, 7)])
+def test_select_distance_pairs_matches_loop(k, block_size):
+    prices = benchmark.synthetic_prices(300, 25)
+
+    pairs = pairs_selection.select_distance_pairs(prices, k=k, block_size=block_size)
+    expected = loop_distance_pairs(prices).head(k)
+
+    assert len(pairs) == min(k, 25 * 24 // 2)
+    assert list(zip(pairs["ticker1"], pairs["ticker2"])) == list(zip(expected["ticker1"], expected["ticker2"]))
+    np.testing.assert_allclose(pairs["distance"], expected["distance"], rtol=1e-9)
+    np.testing.assert_allclose(pairs["ssd"], expected["distance"]**2, rtol=1e-9)
+
+
+def test_select_distance_pairs_leaves_out_short_histories():
+    prices = benchmark.synthetic_prices(300, 10)
+    expected = pairs_selection.select_distance_pairs(prices, k=5)
+
+    prices["DELISTED"] = np.nan
+    prices["LATE"] = np.nan
+    prices.iloc[-5:, -1] = prices.iloc[-5:, 0]
+
+    pd.testing.assert_frame_equal(pairs_selection.select_distance_pairs(prices, k=5), expected)
+
+
+def test_select_distance_pairs_without_prices():
+    prices = benchmark.synthetic_prices(50, 3)
+    prices[:] = np.nan
+
+    pairs = pairs_selection.select_distance_pairs(prices)
+
+    assert list(pairs.columns) == ["ticker1", "ticker2", "ssd", "distance"]
+    assert len(pairs) == 0
+
+
+
+def loop_correlation_pairs(prices: pd.DataFrame, threshold: float, use_returns: bool, min_periods: int) -> pd.DataFrame:
+    """
+    the pairs of pandas.DataFrame.corr above the threshold, in the order of screen_correlation.
+    """
+
+    data = np.log(prices).diff().iloc[1:] if use_returns else prices
+    correlation = data.corr(min_periods=min_periods)
+    n_obs = data.notna().astype(np.int64).T @ data.notna().astype(np.int64)
+    rows = [(ticker1, ticker2, correlation.loc[ticker1, ticker2], n_obs.loc[ticker1, ticker2])
+            for ticker1, ticker2 in itertools.combinations(data.columns, 2)
+            if correlation.loc[ticker1, ticker2] >= threshold]
+
+    return pd.DataFrame(rows, columns=["ticker1", "ticker2", "correlation", "n_obs"])
+
+
+
+def universe_with_gaps(n_bars: int, n_tickers: int) -> pd.DataFrame:
+    """
+    synthetic prices with a late listing, an early delisting, a gap, a ticker without prices and a short one.
+    """
+
+    prices = benchmark.synthetic_prices(n_bars, n_tickers)
+    prices.iloc[:n_bars // 2, 1] = np.nan
+    prices.iloc[n_bars - n_bars // 3:, 2] = np.nan
+    prices.iloc[40:60, 3] = np.nan
+    prices.iloc[:, 4] = np.nan
+    prices.iloc[:-4, 5] = np.nan
+
+    return prices
+
+
+
+@pytest.mark.parametrize("use_returns", [False, True])
+@pytest.mark.parametrize("gaps", [False, True])
+@pytest.mark.parametrize("threshold, min_periods, block_size", [(-1, 2, 512), (0.2, 10, 4), (0.5, 200, 7)])
+def test_screen_correlation_matches_pandas(use_returns, gaps, threshold, min_periods, block_size):
+    prices = universe_with_gaps(300, 15) if gaps else benchmark.synthetic_prices(300, 15)
+
+    edges = pairs_selection.screen_correlation(prices, threshold, use_returns, min_periods, block_size)
+    expected = loop_correlation_pairs(prices, threshold, use_returns, min_periods)
+
+    assert list(zip(edges["ticker1"], edges["ticker2"])) == list(zip(expected["ticker1"], expected["ticker2"]))
+    np.testing.assert_allclose(edges["correlation"], expected["correlation"], rtol=0, atol=1e-10)
+    np.testing.assert_array_equal(edges["n_obs"], expected["n_obs"])
+
+
+def test_screen_correlation_float32_close_to_pandas():
+    prices = universe_with_gaps(300, 15)
+
+    edges = pairs_selection.screen_correlation(prices, -1, dtype=np.float32).set_index(["ticker1", "ticker2"])
+    expected = loop_correlation_pairs(prices, -1, False, 2).set_index(["ticker1", "ticker2"])
+
+    np.testing.assert_allclose(edges["correlation"], expected.loc[edges.index, "correlation"], rtol=0, atol=1e-4)
@@ -0,0 +1,52 @@
+### Tests of the parallel module against the serial run of its tasks
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+import parallel
+
+
+TASK_KWARGS = {
+    "backtest": {"open_position": 1, "close_position": 0, "pct_insample": 0.7},
+    "cointegration": {"lags": 2},
+    "walk_forward": {"train_bars": 120, "test_bars": 30},
+}
+
+
+@pytest.fixture(scope="module")
+def universe():
+    prices = benchmark.synthetic_prices(300, 6)
+    prices.iloc[:80, 5] = np.nan
+    pairs = list(itertools.combinations(prices.columns, 2))
+
+    return prices, pairs
+
+
+
+@pytest.mark.parametrize("task", sorted(TASK_KWARGS))
+def test_run_pairs_matches_serial_task(universe, task):
+    prices, pairs = universe
+    expected = parallel.TASKS[task](prices, pairs, **TASK_KWARGS[task])
+
+    # 15 pairs in chunks of 4: the last chunk is smaller
+    serial, serial_timing = parallel.run_pairs(prices, pairs, task, n_workers=1, chunk_size=4, **TASK_KWARGS[task])
+    shared, shared_timing = parallel.run_pairs(prices, pairs, task, n_workers=2, chunk_size=4, **TASK_KWARGS[task])
+
+    pd.testing.assert_frame_equal(serial, expected)
+    pd.testing.assert_frame_equal(shared, expected)
+    assert list(serial_timing["pairs"]) == list(shared_timing["pairs"]) == [4, 4, 4, 3]
+    assert list(shared_timing["chunk"]) == [0, 1, 2, 3]
+
+
+def test_run_pairs_progress(universe):
+    prices, pairs = universe
+    calls = []
+
+    parallel.run_pairs(prices, pairs, "backtest", n_workers=2, chunk_size=6, progress=lambda done, total: calls.append((done, total)))
+
+    assert calls == [(1, 3), (2, 3), (3, 3)]
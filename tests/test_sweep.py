@@ -0,0 +1,24 @@
+### Tests of the sweep module against backtest_pairs
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import benchmark
+import sweep
+
+
+@pytest.mark.parametrize("open_position, close_position, pct_insample", [(1, 0, 0.7), (2, 0.5, 0.6), (0.5, 1, 0.8)])
+def test_sweep_point_matches_backtest_pairs(open_position, close_position, pct_insample):
+    prices = benchmark.synthetic_prices(400, 6)
+    prices.iloc[30:45, 2] = np.nan
+    pairs = [("T0000", "T0001"), ("T0002", "T0003"), ("T0004", "T0001")]
+    grid = sweep.parameter_grid([open_position], [close_position], [pct_insample])
+
+    swept = sweep.sweep_pairs(prices, pairs, grid)
+    expected = backtest.backtest_pairs(prices, pairs, open_position, close_position, pct_insample)
+
+    pd.testing.assert_frame_equal(swept[expected.columns], expected)
@@ -1,58 +1,204 @@
 ### Viewer module
 ### Author: Joao Ramos Jungblut and Matheus Breitenbach
-### Last update: 2023-03-08
+### Last update: 2026-10-18
 
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 
 
-def generate_zscore_fig(z_score: pd.core.series.Series, signal: pd.core.series.Series, ticker_name1: str, ticker_name2: str):
+# figures show about MAX_POINTS points per trace, and use WebGL above WEBGL_POINTS points
+MAX_POINTS = 2000
+WEBGL_POINTS = 1000
+
+
+def downsample_positions(values: np.ndarray, max_points: int = MAX_POINTS, keep: np.ndarray = None) -> np.ndarray:
     """
-    
+    function to choose the points of a long series that keep its visual shape.
+
+    parameters:
+        values: a numpy array (time) or (time x series).
+        max_points: the number of points to keep, about.
+        keep: an optional boolean numpy array (time) of points that must be kept, such as signal changes.
+
+    The series is cut into max_points / 2 buckets and the minimum and maximum of each bucket are kept,
+    with the first and last points. Returns the sorted positions of the points kept.
     """
 
-    z_score = z_score.rename("Spread", inplace=True)
-    z_score = z_score.to_frame().reset_index()
-    signal = signal.rename("Signal", inplace=True)
-    signal = signal.to_frame().reset_index()
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
 
-    df_zscore_signal = pd.merge(z_score, signal, how='left', on="Date")
-    df_zscore_signal = df_zscore_signal.set_index("Date")
+    n_buckets = max(1, max_points // 2)
+    bucket_size = -(-n // n_buckets)
+    padded = np.full((n_buckets * bucket_size, values.shape[1]), np.nan)
+    padded[:n] = values
+    buckets = padded.reshape(n_buckets, bucket_size, -1)
 
-    fig = px.line(df_zscore_signal, title=f"{ticker_name1} X {ticker_name2}: Spread")
+    first = np.arange(n_buckets)[:, np.newaxis] * bucket_size
+    positions = [first + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1),
+                 first + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1),
+                 np.array([0, n - 1])]
+    if keep is not None:
+        positions.append(np.flatnonzero(keep))
 
-    return fig
+    positions = np.unique(np.concatenate([position.ravel() for position in positions]))
+
+    return positions[positions < n]
 
 
-def generate_normalized_fig(stock1_norm: pd.core.series.Series, stock2_norm: pd.core.series.Series, ticker_name1: str, ticker_name2: str):
+
+def _visible(index: pd.Index, x_range: tuple = None) -> slice:
     """
-    
+    function to get the slice of a sorted date index inside the zoomed dates.
     """
 
-    stock1_norm = stock1_norm.to_frame().reset_index()
-    stock1_norm = stock1_norm.rename(columns={'Adj Close': f'{ticker_name1}'})
+    if x_range is None:
+        return slice(0, len(index))
+
+    return slice(index.searchsorted(pd.Timestamp(x_range[0]), side="left"),
+                 index.searchsorted(pd.Timestamp(x_range[1]), side="right"))
+
 
-    stock2_norm = stock2_norm.to_frame().reset_index()
-    stock2_norm = stock2_norm.rename(columns={'Adj Close': f'{ticker_name2}'})
 
-    df_norm = pd.merge(stock1_norm, stock2_norm, how='left', on="Date")
-    df_norm = df_norm.set_index("Date")
+def _line_figure(x: np.ndarray, traces: dict, title: str, x_title: str) -> go.Figure:
+    """
+    function to build a line figure where every trace uses the same x array.
+
+    parameters:
+        x: a numpy array with the dates of the points.
+        traces: a dict of the name and the numpy array of values of each trace.
+        title: the title of the figure.
+        x_title: the title of the x axis.
+    """
 
-    fig = px.line(df_norm, title=f"{ticker_name1} X {ticker_name2}: Normalized price")
+    scatter = go.Scattergl if len(x) > WEBGL_POINTS else go.Scatter
+    fig = go.Figure(data=[scatter(x=x, y=y, name=name, mode="lines") for name, y in traces.items()])
+    fig.update_layout(title_text=title, xaxis_title_text=x_title, yaxis_title_text="value",
+                      legend_title_text="variable")
 
     return fig
 
 
-def generate_trade_returns_fig(cum_trade_return: pd.core.series.Series):
+
+def _series_figure(index: pd.Index, traces: dict, title: str, max_points: int, x_range: tuple = None,
+                   keep: np.ndarray = None) -> go.Figure:
     """
-    
+    function to cut aligned arrays to the zoomed dates, downsample them together and build their figure.
     """
 
-    cum_trade_return = cum_trade_return.rename("Cumulative Return", inplace=True)
-    cum_trade_return = cum_trade_return.to_frame().reset_index()
-    cum_trade_return = cum_trade_return.set_index("Date")
+    visible = _visible(index, x_range)
+    traces = {name: np.asarray(values, dtype=np.float64)[visible] for name, values in traces.items()}
+    keep = keep[visible] if keep is not None else None
 
-    fig = px.line(cum_trade_return, title=f"Profit")
+    positions = downsample_positions(np.column_stack(list(traces.values())), max_points, keep)
+    x = index[visible].to_numpy()[positions]
 
-    return fig
+    return _line_figure(x, {name: values[positions] for name, values in traces.items()}, title, index.name or "Date")
+
+
+
+def _signal_changes(signal: np.ndarray) -> np.ndarray:
+    """
+    function to mark the bars where the signal changes and the bars just before them.
+    """
+
+    changes = np.flatnonzero(signal[1:] != signal[:-1])
+    keep = np.zeros(len(signal), dtype=bool)
+    keep[changes] = True
+    keep[changes + 1] = True
+
+    return keep
+
+
+
+def _aligned(series: pd.core.series.Series, index: pd.Index) -> np.ndarray:
+    # a series on another index is aligned like a left merge on the dates
+    return series.to_numpy() if series.index.equals(index) else series.reindex(index).to_numpy()
+
+
+
+def generate_figures(index: pd.Index, z_score: np.ndarray, signal: np.ndarray, stock1_norm: np.ndarray, stock2_norm: np.ndarray,
+                     cum_trade_return: np.ndarray, ticker_name1: str, ticker_name2: str,
+                     max_points: int = MAX_POINTS, x_range: tuple = None) -> tuple:
+    """
+    function to build the three figures of the dashboard from arrays aligned on one index.
+
+    parameters:
+        index: a pandas DatetimeIndex with the dates of every array.
+        z_score: a numpy array with the Z-score of the spread.
+        signal: a numpy array with the signal.
+        stock1_norm: a numpy array with the normalized price of the first stock.
+        stock2_norm: a numpy array with the normalized price of the second stock.
+        cum_trade_return: a numpy array with the cumulative trade return.
+        ticker_name1: a string with the name of the first ticker.
+        ticker_name2: a string with the name of the second ticker.
+        max_points: the number of points plotted per figure, about; every change of the signal is kept.
+        x_range: an optional (start, end) of the dates shown.
+
+    Returns (zscore_fig, normalized_price_fig, trade_return_fig).
+    """
+
+    signal = np.asarray(signal, dtype=np.float64)
+    zscore_fig = _series_figure(index, {"Spread": z_score, "Signal": signal}, f"{ticker_name1} X {ticker_name2}: Spread",
+                                max_points, x_range, _signal_changes(signal))
+    normalized_price_fig = _series_figure(index, {ticker_name1: stock1_norm, ticker_name2: stock2_norm},
+                                          f"{ticker_name1} X {ticker_name2}: Normalized price", max_points, x_range)
+    trade_return_fig = _series_figure(index, {"Cumulative Return": cum_trade_return}, "Profit", max_points, x_range)
+
+    return zscore_fig, normalized_price_fig, trade_return_fig
+
+
+
+def generate_zscore_fig(z_score: pd.core.series.Series, signal: pd.core.series.Series, ticker_name1: str, ticker_name2: str,
+                        max_points: int = MAX_POINTS, x_range: tuple = None):
+    """
+    function to plot the Z-score of the spread and the signal.
+
+    parameters:
+        z_score: a pandas Series with the Z-score of the spread.
+        signal: a pandas Series with the signal.
+        ticker_name1: a string with the name of the first ticker.
+        ticker_name2: a string with the name of the second ticker.
+        max_points: the number of points plotted, about; every change of the signal is kept.
+        x_range: an optional (start, end) of the dates shown.
+    """
+
+    signal = _aligned(signal, z_score.index).astype(np.float64)
+
+    return _series_figure(z_score.index, {"Spread": z_score.to_numpy(), "Signal": signal},
+                          f"{ticker_name1} X {ticker_name2}: Spread", max_points, x_range, _signal_changes(signal))
+
+
+def generate_normalized_fig(stock1_norm: pd.core.series.Series, stock2_norm: pd.core.series.Series, ticker_name1: str, ticker_name2: str,
+                            max_points: int = MAX_POINTS, x_range: tuple = None):
+    """
+    function to plot the normalized prices of the pair.
+
+    parameters:
+        stock1_norm: a pandas Series with the normalized price of the first stock.
+        stock2_norm: a pandas Series with the normalized price of the second stock.
+        ticker_name1: a string with the name of the first ticker.
+        ticker_name2: a string with the name of the second ticker.
+        max_points: the number of points plotted, about.
+        x_range: an optional (start, end) of the dates shown.
+    """
+
+    return _series_figure(stock1_norm.index, {ticker_name1: stock1_norm.to_numpy(),
+                                              ticker_name2: _aligned(stock2_norm, stock1_norm.index)},
+                          f"{ticker_name1} X {ticker_name2}: Normalized price", max_points, x_range)
+
+
+def generate_trade_returns_fig(cum_trade_return: pd.core.series.Series, max_points: int = MAX_POINTS, x_range: tuple = None):
+    """
+    function to plot the cumulative return of the pair.
+
+    parameters:
+        cum_trade_return: a pandas Series with the cumulative trade return.
+        max_points: the number of points plotted, about.
+        x_range: an optional (start, end) of the dates shown.
+    """
 
+    return _series_figure(cum_trade_return.index, {"Cumulative Return": cum_trade_return.to_numpy()}, "Profit",
+                          max_points, x_range)
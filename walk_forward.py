@@ -0,0 +1,162 @@
+### Walk-forward module, to backtest the distance approach re-fitted as time goes by
+### Author: Joao Ramos Jungblut and Matheus Breitenbach
+### Last update: 2026-10-18
+
+import warnings
+import numpy as np
+import pandas as pd
+
+import backtest
+import instrument
+
+
+
+def _rolling_extreme(values: np.ndarray, window: int, function) -> np.ndarray:
+    """
+    function to get the minimum or maximum of the last window bars at every bar, NaN skipped.
+
+    parameters:
+        values: a 2-D numpy array, time on axis 0.
+        window: the number of bars of the window.
+        function: np.minimum or np.maximum.
+
+    Van Herk / Gil-Werman: the bars are cut into blocks of window bars, and the extreme of a window is
+    the extreme of the suffix of one block and the prefix of the next, so each bar costs O(1) whatever
+    the window size. Bars before the first full window are NaN.
+    """
+
+    n, columns = values.shape
+    fill = np.inf if function is np.minimum else -np.inf
+    n_blocks = -(-n // window)
+    padded = np.full((n_blocks * window, columns), fill)
+    padded[:n] = np.where(np.isnan(values), fill, values)
+    blocks = padded.reshape(n_blocks, window, columns)
+
+    prefix = function.accumulate(blocks, axis=1).reshape(-1, columns)
+    suffix = function.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, columns)
+
+    extreme = np.full((n, columns), np.nan)
+    ends = np.arange(window - 1, n)
+    extreme[ends] = function(suffix[ends - window + 1], prefix[ends])
+
+    return np.where(np.isinf(extreme), np.nan, extreme)
+
+
+
+def _window_sums(values: np.ndarray, starts: np.ndarray, window: int) -> np.ndarray:
+    # the sum of the window bars before each start, from one cumulative sum
+    cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+
+    return cumulative[starts] - cumulative[starts - window]
+
+
+
+def walk_forward_pairs(prices: pd.DataFrame, pairs, train_bars: int = 252, test_bars: int = 21, open_position: float = 1,
+                       close_position: float = 0) -> dict:
+    """
+    function to run the distance approach walking forward: fit on train_bars, trade the next test_bars, roll.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks, or a dal.IntradayPanel.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns, or a list of (ticker1, ticker2) tuples.
+        train_bars: the number of bars each fit uses.
+        test_bars: the number of bars traded with each fit, and the step between two fits.
+        open_position: the Z-score where a position is opened.
+        close_position: the Z-score where a position is closed.
+
+    At each fit the min and max of each price and the mean and standard deviation of the spread are
+    those of the last train_bars bars, as normalize_series and Z_score would give on that slice, but
+    the standard deviation is the in-sample one, since the out-of-sample is not known yet. The
+    statistics are rolled with window minimums, maximums and cumulative sums instead of being computed
+    again on every slice.
+
+    Returns a dict of pandas DataFrames (out-of-sample dates x pairs) with the stitched z_score,
+    signal and trade_return; the position is carried over from one fit to the next.
+    """
+
+    try:
+        pairs, values, dates, columns, first, second = backtest._pair_columns(prices, pairs)
+        values = values[:, columns].astype(np.float64)
+
+        starts = np.arange(train_bars, len(values), test_bars)
+        if train_bars < 1 or test_bars < 1 or len(starts) == 0:
+            raise ValueError(f"{len(values)} bars are not enough for train_bars={train_bars} and test_bars={test_bars}")
+
+        # min and max of each ticker over the train window of every fit
+        minimum = _rolling_extreme(values, train_bars, np.minimum)[starts - 1]
+        maximum = _rolling_extreme(values, train_bars, np.maximum)[starts - 1]
+
+        # mean and variance of the spread of every fit, from window sums of the prices on the bars
+        # where both prices exist; the prices are centered first to keep the sums accurate
+        x, y = values[:, first], values[:, second]
+        both = ~np.isnan(x) & ~np.isnan(y)
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            center_x, center_y = np.nanmean(np.where(both, x, np.nan), axis=0), np.nanmean(np.where(both, y, np.nan), axis=0)
+            dx, dy = np.where(both, x - center_x, 0), np.where(both, y - center_y, 0)
+            count = _window_sums(both.astype(np.float64), starts, train_bars)
+            mean_x, mean_y = _window_sums(dx, starts, train_bars) / count, _window_sums(dy, starts, train_bars) / count
+            variance_x = _window_sums(dx * dx, starts, train_bars) / count - mean_x**2
+            variance_y = _window_sums(dy * dy, starts, train_bars) / count - mean_y**2
+            covariance = _window_sums(dx * dy, starts, train_bars) / count - mean_x * mean_y
+
+            scale_x = 1 / (maximum[:, first] - minimum[:, first])
+            scale_y = 1 / (maximum[:, second] - minimum[:, second])
+            offset_x, offset_y = center_x - minimum[:, first], center_y - minimum[:, second]
+            spread_mean = scale_y * (mean_y + offset_y) - scale_x * (mean_x + offset_x)
+            spread_std = np.sqrt(np.maximum(scale_y**2 * variance_y + scale_x**2 * variance_x
+                                            - 2 * scale_x * scale_y * covariance, 0))
+
+            # out-of-sample bars, each scored with the fit before it
+            bars = np.arange(starts[0], len(values))
+            fit = (bars - starts[0]) // test_bars
+            spread = scale_y[fit] * (y[bars] - minimum[fit][:, second]) - scale_x[fit] * (x[bars] - minimum[fit][:, first])
+            z_score = (spread - spread_mean[fit]) / spread_std[fit]
+
+        signal = backtest._signal_states(z_score, np.abs(open_position), np.abs(close_position))
+        x_return = np.nan_to_num(np.diff(np.log(x), axis=0, prepend=np.nan))[bars]
+        y_return = np.nan_to_num(np.diff(np.log(y), axis=0, prepend=np.nan))[bars]
+        trade_return = backtest._trade_returns(signal, x_return, y_return)
+
+        columns = pd.MultiIndex.from_tuples(pairs, names=["ticker1", "ticker2"])
+        index = dates[bars]
+        results = {"z_score": pd.DataFrame(z_score, index=index, columns=columns),
+                   "signal": pd.DataFrame(signal, index=index, columns=columns),
+                   "trade_return": pd.DataFrame(trade_return, index=index, columns=columns)}
+    except (TypeError, AttributeError, ValueError, KeyError) as error:
+        warnings.warn(f"Could not walk forward: {error}")
+        return -1
+
+    return results
+
+
+
+@instrument.timed("backtest_walk_forward")
+def backtest_walk_forward(prices: pd.DataFrame, pairs, train_bars: int = 252, test_bars: int = 21, open_position: float = 1,
+                          close_position: float = 0, periods_per_year: int = 252) -> pd.DataFrame:
+    """
+    This function run the walk-forward backtest of many pairs and summarize their out-of-sample performance.
+
+    parameters:
+        prices: a pandas DataFrame (dates x tickers) with the prices of the stocks, or a dal.IntradayPanel.
+        pairs: a pandas DataFrame with ticker1 and ticker2 columns, or a list of (ticker1, ticker2) tuples.
+        train_bars: the number of bars each fit uses.
+        test_bars: the number of bars traded with each fit, and the step between two fits.
+        open_position: the Z-score where a position is opened.
+        close_position: the Z-score where a position is closed.
+        periods_per_year: the number of bars in a year, used to annualize the Sharpe ratio.
+
+    Returns a pandas DataFrame with one row per pair and the columns of calculate_performance, like
+    backtest.backtest_pairs, so parallel.run_pairs can run it over the whole universe.
+    """
+
+    results = walk_forward_pairs(prices, pairs, train_bars, test_bars, open_position, close_position)
+    if isinstance(results, int):
+        return -1
+
+    performance = pd.DataFrame(backtest.calculate_performance(results["trade_return"].to_numpy(),
+                                                              results["signal"].to_numpy(), periods_per_year))
+    performance.insert(0, "ticker1", results["signal"].columns.get_level_values("ticker1"))
+    performance.insert(1, "ticker2", results["signal"].columns.get_level_values("ticker2"))
+
+    return performance